@@ -11,23 +11,42 @@ from async_timeout import timeout
 from . import libpyialarmmk as ipyialarmmk
 
 
-from homeassistant.components.alarm_control_panel import SCAN_INTERVAL
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
     CONF_HOST,
     CONF_PASSWORD,
     CONF_PORT,
     CONF_USERNAME,
+    EVENT_LOGBOOK_ENTRY,
     Platform,
 )
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
-from .const import DOMAIN, ATTR_SENSOR_INSTALL_ENABLED
+from .const import (
+    DOMAIN,
+    EVENT_IALARMMK,
+    ATTR_EVENT_COALESCE,
+    ATTR_EVENT_JOURNAL,
+    ATTR_FRAME_CAPTURE,
+    ATTR_HEALTH_SCAN_RATE,
+    ATTR_RELAY_MAX_RATE,
+    ATTR_SENSOR_INSTALL_ENABLED,
+    ATTR_STALENESS_LIMIT,
+    DEFAULT_HEALTH_SCAN_RATE,
+    DEFAULT_STALENESS_LIMIT,
+    HEALTH_SCAN_INTERVAL,
+    LOG_SYNC_INTERVAL,
+    STANDBY_KEEPALIVE_INTERVAL,
+    ZONE_STATS_SAVE_DELAY,
+)
+from .services import async_setup_services, async_unload_services
 from .utils import async_get_ialarmmk_mac
 
-PLATFORMS = [Platform.ALARM_CONTROL_PANEL, Platform.BINARY_SENSOR]
+PLATFORMS = [Platform.ALARM_CONTROL_PANEL, Platform.BINARY_SENSOR, Platform.SWITCH]
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -38,6 +57,23 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     username = entry.data[CONF_USERNAME]
     password = entry.data[CONF_PASSWORD]
 
+    capture = None
+    if entry.options.get(ATTR_FRAME_CAPTURE, entry.data.get(ATTR_FRAME_CAPTURE, False)):
+        capture = ipyialarmmk.FrameCapture(
+            hass.config.path(f"{DOMAIN}_{entry.entry_id}.cap")
+        )
+
+    journal = None
+    if entry.options.get(ATTR_EVENT_JOURNAL, entry.data.get(ATTR_EVENT_JOURNAL, True)):
+        journal = ipyialarmmk.EventJournal(
+            hass.config.path(f"{DOMAIN}_{entry.entry_id}.jsonl")
+        )
+
+    # Restored before the interface publishes its first snapshot.
+    stats_store = Store(hass, 1, f"{DOMAIN}.{entry.entry_id}.zone_stats")
+    zone_stats = ipyialarmmk.ZoneStats()
+    zone_stats.load(await stats_store.async_load())
+
     ialarmmk = ipyialarmmk.iAlarmMkInterface(
         username,
         password,
@@ -46,20 +82,70 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         entry.options.get(ATTR_SENSOR_INSTALL_ENABLED, entry.data.get(ATTR_SENSOR_INSTALL_ENABLED, False)),
         hass,
         _LOGGER,
+        entry.options.get(ATTR_RELAY_MAX_RATE, entry.data.get(ATTR_RELAY_MAX_RATE)),
+        capture,
+        entry.options.get(ATTR_EVENT_COALESCE, entry.data.get(ATTR_EVENT_COALESCE, True)),
+        zone_stats,
+        journal,
     )
 
     try:
         async with timeout(10):
             ialarmmk_mac = await async_get_ialarmmk_mac(hass, ialarmmk)
     except (asyncio.TimeoutError, ConnectionError) as ex:
+        # Both start a writer thread; each setup retry would leak them.
+        if capture is not None:
+            await hass.async_add_executor_job(capture.close)
+        if journal is not None:
+            await hass.async_add_executor_job(journal.close)
         raise ConfigEntryNotReady from ex
 
-    coordinator = iAlarmMkDataUpdateCoordinator(hass, ialarmmk, ialarmmk_mac)
-    coordinator.initialize_sensors()
+    await hass.async_add_executor_job(ialarmmk.initialize)
+
+    coordinator = iAlarmMkDataUpdateCoordinator(
+        hass,
+        ialarmmk,
+        ialarmmk_mac,
+        entry.options.get(
+            ATTR_STALENESS_LIMIT,
+            entry.data.get(ATTR_STALENESS_LIMIT, DEFAULT_STALENESS_LIMIT),
+        ),
+    )
+    coordinator.initialize_sensors(
+        entry.options.get(
+            ATTR_HEALTH_SCAN_RATE,
+            entry.data.get(ATTR_HEALTH_SCAN_RATE, DEFAULT_HEALTH_SCAN_RATE),
+        )
+    )
 
     await coordinator.async_config_entry_first_refresh()
 
+    await coordinator.async_load_log_cursor(entry)
+    coordinator.stats_store = stats_store
+    entry.async_on_unload(coordinator.async_add_listener(coordinator.save_zone_stats))
+    entry.async_on_unload(
+        async_track_time_interval(
+            hass, coordinator.async_sync_log, timedelta(seconds=LOG_SYNC_INTERVAL)
+        )
+    )
+    entry.async_on_unload(
+        async_track_time_interval(
+            hass,
+            coordinator.async_keep_standby,
+            timedelta(seconds=STANDBY_KEEPALIVE_INTERVAL),
+        )
+    )
+    if coordinator.health is not None:
+        entry.async_on_unload(
+            async_track_time_interval(
+                hass,
+                coordinator.async_scan_health,
+                timedelta(seconds=HEALTH_SCAN_INTERVAL),
+            )
+        )
+
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+    async_setup_services(hass)
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
@@ -76,6 +162,8 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         if coordinator:
             await coordinator.shutdown()
             coordinator.sensors.clear()  # cleanup custom data
+        if not hass.data[DOMAIN]:
+            async_unload_services(hass)
     return unload_ok
 
 
@@ -87,36 +175,148 @@ class iAlarmMkDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching iAlarm-MK data."""
 
     def __init__(
-        self, hass: HomeAssistant, ialarmmk: ipyialarmmk.iAlarmMkInterface, mac: str
+        self,
+        hass: HomeAssistant,
+        ialarmmk: ipyialarmmk.iAlarmMkInterface,
+        mac: str,
+        staleness_limit: float = DEFAULT_STALENESS_LIMIT,
     ) -> None:
         """Initialize global a iAlarm-MK data updater."""
         self.ialarmmk: ipyialarmmk.iAlarmMkInterface = ialarmmk
-        self.state: int = ialarmmk.get_status()
         self.host: str = ialarmmk.host
         self.mac: str = mac
+        self.staleness_limit: float = staleness_limit
         self.hass = hass
-        self.sensors = {}
+        self.sensors = ipyialarmmk.ZoneStore()
+        self.log_sync = ipyialarmmk.LogSync()
+        self.health: ipyialarmmk.HealthScanner | None = None
+        self._log_store: Store | None = None
+        self.stats_store: Store | None = None
+        # State writes collapsed by the flapping zone throttling.
+        self.suppressed_writes = 0
 
         self.ialarmmk.set_callback(self.callback)
         self.ialarmmk.set_polling_callback(self.polling_callback)
+        self._unsubscribe_events = self.ialarmmk.events.subscribe(self.fire_event)
 
         super().__init__(
             hass,
             _LOGGER,
             name=DOMAIN,
             update_interval=timedelta(seconds=5),
+            # Unchanged polls return equal data and do not wake the entities.
+            always_update=False,
         )
 
         self._subscribe_task = asyncio.create_task(self.ialarmmk.subscribe())
         # self._polling_task = asyncio.create_task(self.ialarmmk.polling())
 
+    @property
+    def snapshot(self) -> ipyialarmmk.PanelSnapshot:
+        """Return the current immutable panel snapshot."""
+        return self.ialarmmk.snapshot
+
+    @property
+    def state(self) -> int:
+        return self.ialarmmk.snapshot.status
+
     def callback(self, status):
         _LOGGER.debug("iAlarm-MK status: %s", status)
-        self.state = status
-        self.async_set_updated_data(status)
+        self.async_publish()
 
     def polling_callback(self):
-        self.async_set_updated_data(self.state)
+        self.async_publish()
+
+    def async_publish(self) -> None:
+        """Hand the current snapshot to the entities."""
+        self.async_set_updated_data((self.snapshot, self.relay_available))
+
+    def fire_event(self, event: ipyialarmmk.AlarmEvent):
+        """Fire every decoded Cid event on the HA bus for automations."""
+        if (
+            self.health is not None
+            and event.cid in ipyialarmmk.TROUBLE_CIDS
+            and event.zone
+        ):
+            # Alarm frames number zones from 1, device indexes start at 0.
+            self.health.prioritize(event.zone - 1)
+        self.hass.bus.async_fire(
+            EVENT_IALARMMK,
+            {
+                "mac": self.mac,
+                "cid": event.cid,
+                "description": event.description,
+                "severity": event.severity,
+                "zone": event.zone,
+                "name": event.name,
+                "count": event.count,
+                "synthetic": event.synthetic,
+            },
+        )
+
+    async def async_keep_standby(self, now=None) -> None:
+        """Keep the warm command session connected and logged in."""
+        if self.ialarmmk.breaker.is_open:
+            return
+        await self.hass.async_add_executor_job(self.ialarmmk.standby.keepalive)
+
+    async def async_load_log_cursor(self, entry: ConfigEntry) -> None:
+        """Restore the panel log cursor persisted by the last run."""
+        self._log_store = Store(self.hass, 1, f"{DOMAIN}.{entry.entry_id}.log_cursor")
+        self.log_sync.cursor = await self._log_store.async_load() or {}
+
+    async def async_sync_log(self, now=None) -> None:
+        """Publish panel log entries added since the last sync to the logbook."""
+        cursor = dict(self.log_sync.cursor)
+        entries = await self.hass.async_add_executor_job(
+            self.ialarmmk.read_log, self.log_sync
+        )
+        for entry in entries:
+            self.hass.bus.async_fire(
+                EVENT_LOGBOOK_ENTRY,
+                {
+                    "name": "iAlarm-MK",
+                    "message": self._log_message(entry),
+                    "domain": DOMAIN,
+                },
+            )
+        # Also the first sync, which only anchors the cursor: otherwise a
+        # restart before the next entry re-anchors past what was missed.
+        if self.log_sync.cursor != cursor and self._log_store is not None:
+            self._log_store.async_delay_save(lambda: self.log_sync.cursor, 10)
+
+    @staticmethod
+    def _log_message(entry) -> str:
+        if not isinstance(entry, dict):
+            return str(entry)
+        cid = entry.get("Cid", entry.get("Event"))
+        try:
+            info = ipyialarmmk.Cid.get(int(cid))
+        except (TypeError, ValueError):
+            info = None
+        parts = [info.description if info is not None else str(cid)]
+        for key in ("Zone", "Name"):
+            if entry.get(key) not in (None, ""):
+                parts.append(f"{key.lower()} {entry[key]}")
+        return ", ".join(parts)
+
+    def save_zone_stats(self) -> None:
+        """Persist the zone statistics a while after they last changed."""
+        if self.stats_store is not None:
+            self.stats_store.async_delay_save(
+                self.ialarmmk.zone_stats.dump, ZONE_STATS_SAVE_DELAY
+            )
+
+    @property
+    def staleness(self) -> float | None:
+        """Return the age in seconds of the last known panel state."""
+        return self.ialarmmk.staleness()
+
+    @property
+    def relay_available(self) -> bool:
+        """Return False once the last known state is older than the limit."""
+        staleness = self.staleness
+        return staleness is not None and staleness <= self.staleness_limit
 
     def _update_data(self) -> None:
         """Fetch data from iAlarm-MK via sync functions."""
@@ -125,15 +325,28 @@ class iAlarmMkDataUpdateCoordinator(DataUpdateCoordinator):
         #    self.sensors[sensor_id]["state"] = self.ialarmmk.get_sensor_status(sensor_id)
         # self.state = status
 
-    def initialize_sensors(self):
+    def initialize_sensors(self, health_scan_rate: int = 0):
         """Query the alarm for sensors and initialize them."""
         self.sensors = (
             self.ialarmmk.get_sensors()
         )  # returns list of dicts with id and zone
-
-    async def _async_update_data(self) -> None:
+        if self.sensors and health_scan_rate > 0:
+            self.health = ipyialarmmk.HealthScanner(
+                [sensor.index for sensor in self.sensors.values()],
+                max_per_minute=health_scan_rate,
+            )
+
+    async def async_scan_health(self, now=None) -> None:
+        """Refresh battery and tamper state of the next devices."""
+        if await self.hass.async_add_executor_job(
+            self.ialarmmk.scan_health, self.health
+        ):
+            self.async_publish()
+
+    async def _async_update_data(self) -> tuple:
         """Fetch data from iAlarm-MK."""
         await self.ialarmmk.polling_once()
+        return self.snapshot, self.relay_available
         # try:
         #    async with timeout(10):
         #        await self.hass.async_add_executor_job(self._update_data)
@@ -151,6 +364,18 @@ class iAlarmMkDataUpdateCoordinator(DataUpdateCoordinator):
             except asyncio.CancelledError:
                 pass
 
+        self._unsubscribe_events()
+        self.ialarmmk.events.stop()
+
         # Optionally tell your library to disconnect
         if hasattr(self.ialarmmk, "disconnect"):
             await self.hass.async_add_executor_job(self.ialarmmk.disconnect)
+
+        if self.ialarmmk.capture is not None:
+            await self.hass.async_add_executor_job(self.ialarmmk.capture.close)
+
+        if self.stats_store is not None:
+            await self.stats_store.async_save(self.ialarmmk.zone_stats.dump())
+
+        if self.ialarmmk.journal is not None:
+            await self.hass.async_add_executor_job(self.ialarmmk.journal.close)
@@ -3,6 +3,10 @@
 from __future__ import annotations
 
 import logging
+from datetime import timedelta
+
+import voluptuous as vol
+
 from . import libpyialarmmk as ipyialarmmk
 
 from homeassistant.components.alarm_control_panel import (
@@ -15,14 +19,31 @@ from homeassistant.components.alarm_control_panel import (
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_CODE
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceResponse, SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import entity_platform
 from homeassistant.helpers import device_registry
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from . import iAlarmMkDataUpdateCoordinator
-from .const import DOMAIN, ATTR_CODE_DISARM_REQUIRED
+from .const import (
+    DOMAIN,
+    ATTR_BYPASS,
+    ATTR_CODE_DISARM_REQUIRED,
+    ATTR_MODE,
+    ATTR_STALENESS,
+    ATTR_SUPPRESSED_WRITES,
+    ATTR_ZONES,
+    MODE_AWAY,
+    MODE_HOME,
+    SERVICE_ARM_BYPASS,
+    SERVICE_BYPASS_ZONES,
+    STALENESS_REFRESH_INTERVAL,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -44,6 +65,29 @@ async def async_setup_entry(
     coordinator = hass.data[DOMAIN][entry.entry_id]
     async_add_entities([iAlarmMkPanel(coordinator)])
 
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_BYPASS_ZONES,
+        {
+            vol.Required(ATTR_ZONES): vol.All(
+                cv.ensure_list, [vol.All(vol.Coerce(int), vol.Range(min=1))]
+            ),
+            vol.Optional(ATTR_BYPASS, default=True): cv.boolean,
+            vol.Optional(CONF_CODE): cv.string,
+        },
+        "async_bypass_zones",
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    platform.async_register_entity_service(
+        SERVICE_ARM_BYPASS,
+        {
+            vol.Optional(ATTR_MODE, default=MODE_AWAY): vol.In([MODE_AWAY, MODE_HOME]),
+            vol.Optional(CONF_CODE): cv.string,
+        },
+        "async_arm_bypass",
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
 
 class iAlarmMkPanel(
     CoordinatorEntity[iAlarmMkDataUpdateCoordinator], AlarmControlPanelEntity
@@ -56,14 +100,28 @@ class iAlarmMkPanel(
     )
     _attr_name = "iAlarm-MK"
     _attr_icon = "mdi:security"
+    # Refreshed on a timer: kept out of the recorder.
+    _unrecorded_attributes = frozenset(
+        {
+            ATTR_STALENESS,
+            "command_latency_p50",
+            "command_latency_p99",
+            ATTR_SUPPRESSED_WRITES,
+        }
+    )
 
     def __init__(self, coordinator: iAlarmMkDataUpdateCoordinator) -> None:
         """Initialize the alarm panel."""
         super().__init__(coordinator)
         self._attr_unique_id = coordinator.mac
-        self._attr_code_arm_required = False
-        self._attr_code_format = None
+        # Options changes reload the entry, so the merged config is built once.
+        self._config = {
+            **coordinator.config_entry.data,
+            **(coordinator.config_entry.options or {}),
+        }
+        self._code_disarm_required = self._config.get(ATTR_CODE_DISARM_REQUIRED, False)
         self._attr_code = self._config.get(CONF_CODE)
+        self._update_derived()
         self._attr_device_info = DeviceInfo(
             manufacturer="iAlarm-MK",
             name=self.name,
@@ -76,17 +134,54 @@ class iAlarmMkPanel(
 #        """Return the state of the device."""
 #        return IALARMMK_TO_HASS.get(self.coordinator.state)
 
+    def _update_derived(self) -> None:
+        """Compute the state dependent attributes once per coordinator update."""
+        self._attr_alarm_state = IALARMMK_TO_HASS.get(self.coordinator.data[0].status)
+        if self._attr_alarm_state != AlarmControlPanelState.DISARMED:
+            self._attr_code_arm_required = self._code_disarm_required
+        else:
+            self._attr_code_arm_required = False
+        self._attr_code_format = (
+            CodeFormat.NUMBER if self._attr_code_arm_required else None
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._update_derived()
+        super()._handle_coordinator_update()
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # During an outage no coordinator update comes, which is when the
+        # staleness matters most: it is rewritten on its own timer.
+        self.async_on_remove(
+            async_track_time_interval(
+                self.hass,
+                self._async_refresh_staleness,
+                timedelta(seconds=STALENESS_REFRESH_INTERVAL),
+            )
+        )
+
+    @callback
+    def _async_refresh_staleness(self, _now=None) -> None:
+        self.async_write_ha_state()
+
     @property
-    def _config(self) -> dict:
-        """Return a merged dict of config_entry data + options."""
-        merged = dict(self.coordinator.config_entry.data)
-        merged.update(self.coordinator.config_entry.options or {})
-        return merged
+    def available(self) -> bool:
+        """Serve the last known state until it exceeds the staleness limit."""
+        return super().available and self.coordinator.relay_available
 
     @property
-    def alarm_state(self) -> AlarmControlPanelState | None:
-        """Return the state of the device."""
-        return IALARMMK_TO_HASS.get(self.coordinator.state)
+    def extra_state_attributes(self) -> dict:
+        """Return the age of the state shown by the panel."""
+        staleness = self.coordinator.staleness
+        latency = self.coordinator.ialarmmk.standby.stats()
+        return {
+            ATTR_STALENESS: round(staleness) if staleness is not None else None,
+            "command_latency_p50": latency["p50"],
+            "command_latency_p99": latency["p99"],
+            ATTR_SUPPRESSED_WRITES: self.coordinator.suppressed_writes,
+        }
 
     def alarm_disarm(self, code: str | None = None) -> None:
         # call your coordinator to disarm
@@ -124,41 +219,51 @@ class iAlarmMkPanel(
         except:
             self.logger.debug("iAlarm-MK Unable to arm away", exc_info=True)
 
-    @property
-    def code_arm_required(self):
-        """Whether the code is required for arm actions."""
-        # if not self._config or ATTR_CODE_ARM_REQUIRED not in self._config:
-        #    return True  # assume code is needed (conservative approach)
-        try:
-            if (IALARMMK_TO_HASS.get(self.coordinator.state)!= AlarmControlPanelState.DISARMED):
-                return self._config.get(ATTR_CODE_DISARM_REQUIRED, False)
-        except:
-            self.logger.debug("iAlarm-MK Unable to get code_arm_required", exc_info=True)
-
-        return self._attr_code_arm_required
+    def _check_code(self, code: str | None) -> None:
+        if self.code_arm_required and (
+            not code or self._get_code(code) != self._get_code(self._attr_code)
+        ):
+            raise HomeAssistantError("iAlarm-MK wrong code")
 
-    @property
-    def code_format(self):
-        """Return whether code consists of digits or characters."""
+    async def async_bypass_zones(
+        self, zones: list[int], bypass: bool = True, code: str | None = None
+    ) -> ServiceResponse:
+        """Bypass or restore several zones, numbered from 1, in one session."""
+        self._check_code(code)
         try:
-            if (
-                IALARMMK_TO_HASS.get(self.coordinator.state)
-                == AlarmControlPanelState.DISARMED
-                and self.code_arm_required
-            ):
-                return CodeFormat.NUMBER
-
-            if (
-                IALARMMK_TO_HASS.get(self.coordinator.state)
-                != AlarmControlPanelState.DISARMED
-                and self._config
-                and self._config.get(ATTR_CODE_DISARM_REQUIRED, False)
-            ):
-                return CodeFormat.NUMBER
-        except:
-            self.logger.debug("iAlarm-MK Unable to get code_format", exc_info=True)
+            done, failed = await self.hass.async_add_executor_job(
+                self.coordinator.ialarmmk.bypass_zones,
+                [zone - 1 for zone in zones],
+                bypass,
+            )
+        except Exception as ex:
+            raise HomeAssistantError("iAlarm-MK unable to bypass zones") from ex
+        self.coordinator.async_publish()
+        return {
+            "zones": [index + 1 for index in done],
+            "failed": [index + 1 for index in failed],
+        }
 
-        return None
+    async def async_arm_bypass(
+        self, mode: str = MODE_AWAY, code: str | None = None
+    ) -> ServiceResponse:
+        """Bypass the open zones and arm, in one session."""
+        self._check_code(code)
+        status = (
+            ipyialarmmk.iAlarmMkInterface.ARMED_STAY
+            if mode == MODE_HOME
+            else ipyialarmmk.iAlarmMkInterface.ARMED_AWAY
+        )
+        try:
+            bypassed, armed = await self.hass.async_add_executor_job(
+                self.coordinator.ialarmmk.arm_bypass, status
+            )
+        except Exception as ex:
+            raise HomeAssistantError("iAlarm-MK unable to arm") from ex
+        self.coordinator.async_publish()
+        if not armed:
+            raise HomeAssistantError("iAlarm-MK panel refused to arm")
+        return {"bypassed": [index + 1 for index in bypassed]}
 
     def _get_code(self,code: str | None = None) -> int:
         """Return code if set."""
@@ -4,10 +4,23 @@ from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers import device_registry
 from homeassistant.components.binary_sensor import BinarySensorDeviceClass
 
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+
 from . import iAlarmMkDataUpdateCoordinator
+from . import libpyialarmmk as ipyialarmmk
 
-from .const import DOMAIN
+from .const import (
+    DOMAIN,
+    ATTR_FLAP_WINDOW_INTERIOR,
+    ATTR_FLAP_WINDOW_PERIMETER,
+    ATTR_SUPPRESSED_WRITES,
+    DEFAULT_FLAP_WINDOW_INTERIOR,
+    DEFAULT_FLAP_WINDOW_PERIMETER,
+)
 import logging
+import time
 
 _LOGGER = logging.getLogger(__name__)
 from homeassistant.helpers import entity_registry as er
@@ -18,39 +31,61 @@ async def async_setup_entry(hass, entry, async_add_entities):
 
     entities = []
 
-    await cleanup_removed_sensors(hass, list(coordinator.sensors.keys()))
+    interior = entry.options.get(
+        ATTR_FLAP_WINDOW_INTERIOR,
+        entry.data.get(ATTR_FLAP_WINDOW_INTERIOR, DEFAULT_FLAP_WINDOW_INTERIOR),
+    )
+    perimeter = entry.options.get(
+        ATTR_FLAP_WINDOW_PERIMETER,
+        entry.data.get(ATTR_FLAP_WINDOW_PERIMETER, DEFAULT_FLAP_WINDOW_PERIMETER),
+    )
+    # GetZone types: delay and perimeter, interior and follower zones. The
+    # 24 hour, fire, gas, water and key zones are never throttled.
+    flap_windows = {1: perimeter, 2: perimeter, 3: interior, 4: interior}
 
     for sensor_id, sensor in coordinator.sensors.items():
         if len(sensor_id) == 0:
             continue
-        entities.append(iAlarmMkBinarySensor(coordinator, sensor))
+        entities.append(
+            iAlarmMkBinarySensor(
+                coordinator, sensor, flap_windows.get(sensor.type, 0) / 1000
+            )
+        )
+        if coordinator.health is not None:
+            entities.append(iAlarmMkHealthSensor(coordinator, sensor, "battery"))
+            entities.append(iAlarmMkHealthSensor(coordinator, sensor, "tamper"))
 
-    async_add_entities(entities)
+    await cleanup_removed_sensors(
+        hass, entry, [entity.unique_id for entity in entities]
+    )
 
+    async_add_entities(entities)
 
-async def cleanup_removed_sensors(hass, current_sensor_ids: list[str]):
-    """Remove sensor entities not found anymore on the alarm system."""
-    entity_registry = er.async_get(hass)
-    ids_to_remove = []
 
-    # Loop through all entities of your domain
-    for entity_id, entity_entry in list(entity_registry.entities.items()):
-        # Check that it belongs to your integration
-        if entity_entry.platform != DOMAIN:
-            continue
+async def cleanup_removed_sensors(hass, entry, current_sensor_ids: list[str]):
+    """Remove sensor entities not found anymore on the alarm system.
 
-        # You can also check that it’s a binary_sensor if you only want those
-        if entity_entry.domain != "binary_sensor":
-            continue
+    Only the registry entries of this config entry are looked at, so the
+    cost does not depend on the size of the rest of the installation.
+    Returns the (added, removed) unique ids.
+    """
+    entity_registry = er.async_get(hass)
+    registered = {
+        entity_entry.unique_id: entity_entry.entity_id
+        for entity_entry in er.async_entries_for_config_entry(
+            entity_registry, entry.entry_id
+        )
+        if entity_entry.domain == "binary_sensor"
+    }
+    current = set(current_sensor_ids)
+    added = current - registered.keys()
+    removed = registered.keys() - current
 
-        # Example: your sensor unique_id is the alarm sensor id
-        if entity_entry.unique_id not in current_sensor_ids:
-            # Remove it from HA
-            ids_to_remove.append(entity_entry.entity_id)
+    for unique_id in removed:
+        _LOGGER.info("Removing iAlarm-MK sensor entity: %s", registered[unique_id])
+        entity_registry.async_remove(registered[unique_id])
 
-    for entity_id in ids_to_remove:
-        _LOGGER.info("Removing iAlarm-MK sensor entity: %s", entity_id)
-        entity_registry.async_remove(entity_entry.entity_id)
+    return added, removed
 
 
 class iAlarmMkBinarySensor(
@@ -58,56 +93,184 @@ class iAlarmMkBinarySensor(
 ):
     """Representation of a iAlarm-MK binary sensor."""
 
-    def __init__(self, coordinator: iAlarmMkDataUpdateCoordinator, sensor):
+    # Counters that change without the zone changing: not recorded. The
+    # relay staleness is only shown by the panel entity.
+    _unrecorded_attributes = frozenset(
+        {"opens_last_hour", "battery_trouble_seconds", ATTR_SUPPRESSED_WRITES}
+    )
+
+    def __init__(
+        self, coordinator: iAlarmMkDataUpdateCoordinator, sensor, flap_window=0.0
+    ):
         super().__init__(coordinator)
         self._sensor = sensor
-        self._attr_name = f"{sensor['zone']['Name']}"
-        self._attr_unique_id = f"{sensor['id']}"
-        self._attr_device_class = sensor.get("class", "door")
-        self.entity_id = f"binary_sensor.ialarmmk_{sensor['zone']['Name'].lower().replace(' ', '_')}_{sensor['id'].lower().replace(' ', '_')}"
+        self._flap_window = flap_window
+        self._last_write = 0.0
+        self._deferred = 0
+        self._flush_cancel = None
+        self._last_opened = (None, None)
+        self.suppressed_writes = 0
+        self._attr_name = f"{sensor.name}"
+        self._attr_unique_id = f"{sensor.id}"
+        self._attr_device_class = sensor.device_class
+        self.entity_id = f"binary_sensor.ialarmmk_{sensor.name.lower().replace(' ', '_')}_{sensor.id.lower().replace(' ', '_')}"
         self._attr_device_info = DeviceInfo(
             manufacturer="iAlarm-MK",
             name=f"Sensori iAlarm-MK",
             connections={(device_registry.CONNECTION_NETWORK_MAC, coordinator.mac)},
         )
+        self._update_derived(coordinator.data[0])
 
-    @property
-    def _config(self) -> dict:
-        """Return a merged dict of config_entry data + options."""
-        merged = dict(self.coordinator.config_entry.data)
-        merged.update(self.coordinator.config_entry.options or {})
-        return merged
+    def _update_derived(self, snapshot):
+        """Read the zone state from the snapshot delivered with the update."""
+        index = self._sensor.index
+        low_battery = snapshot.is_low_battery(index)
+        self._attr_is_on = snapshot.is_open(index)
+        if low_battery:
+            self._attr_icon = "mdi:battery-alert"
+        elif snapshot.is_alert(index):
+            self._attr_icon = "mdi:bell-alert"
+        else:
+            # otherwise the default icon for its device_class
+            self._attr_icon = None
+        self._attr_extra_state_attributes = {
+            "battery_warning": low_battery,
+            "battery_level": "low" if low_battery else "normal",
+            ATTR_SUPPRESSED_WRITES: self.suppressed_writes,
+        }
+        stats = self.coordinator.ialarmmk.zone_stats.get(index)
+        if stats is not None:
+            last_opened = stats["last_opened"]
+            if last_opened != self._last_opened[0]:
+                self._last_opened = (
+                    last_opened,
+                    dt_util.utc_from_timestamp(last_opened).isoformat()
+                    if last_opened is not None
+                    else None,
+                )
+            self._attr_extra_state_attributes.update(
+                last_opened=self._last_opened[1],
+                opens_last_hour=stats["opens_last_hour"],
+                battery_trouble_seconds=stats["battery_trouble_seconds"],
+            )
 
-    @property
-    def is_on(self):
-        return self.coordinator.ialarmmk.is_sensor_open(self._sensor["id"])
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state, collapsing the flaps of a disarmed zone.
 
-    @property
-    def available(self):
-        return self.coordinator.state != "unavailable"
+        An open/close change within the zone class window after the last
+        write is held back, and so is everything after it until the window
+        ends; then only the latest state is written. Updates of other zones
+        leave the held state alone. Alerts, low battery and any update while
+        the panel is not disarmed are written at once, together with
+        whatever was held back.
+        """
+        snapshot = self.coordinator.data[0]
+        was_on = self._attr_is_on
+        self._update_derived(snapshot)
+        if self._attr_is_on != was_on:
+            self._deferred += 1
+        exempt = (
+            self._flap_window <= 0
+            or self._attr_icon is not None
+            or snapshot.status != ipyialarmmk.iAlarmMkInterface.DISARMED
+        )
+        if self._flush_cancel is not None:
+            if not exempt:
+                return
+            self._flush_cancel()
+            self._flush_cancel = None
+        elif not exempt and self._attr_is_on != was_on:
+            now = time.monotonic()
+            if now - self._last_write < self._flap_window:
+                self._flush_cancel = async_call_later(
+                    self.hass, self._last_write + self._flap_window - now, self._flush
+                )
+                return
+        self._write()
 
-    @property
-    def extra_state_attributes(self):
-        status = self.coordinator.ialarmmk.get_sensor_status(self._sensor["id"])
-        attrs = {}
-        if status in (17, 25):
-            attrs["battery_warning"] = True
-            attrs["battery_level"] = "low"
-        else:
-            attrs["battery_warning"] = False
-            attrs["battery_level"] = "normal"
-        return attrs
+    @callback
+    def _flush(self, _now) -> None:
+        self._flush_cancel = None
+        self._write()
+
+    def _write(self):
+        # Every held back change but the last one written never shows up.
+        self._suppress(self._deferred - 1)
+        self._last_write = time.monotonic()
+        super()._handle_coordinator_update()
+
+    def _suppress(self, count):
+        self._deferred = 0
+        if count > 0:
+            self.suppressed_writes += count
+            self.coordinator.suppressed_writes += count
+            self._attr_extra_state_attributes[ATTR_SUPPRESSED_WRITES] = (
+                self.suppressed_writes
+            )
 
     @property
-    def icon(self):
-        status = self.coordinator.ialarmmk.get_sensor_status(self._sensor["id"])
-        if status in (17, 25):
-            return "mdi:battery-alert"
-        elif status in (3, 11, 19, 27):
-            return "mdi:bell-alert"
-            # 🧠 otherwise, return the default icon for its device_class
-        return super().icon
+    def available(self):
+        # Delivered with the update, not recomputed on every state write.
+        return super().available and self.coordinator.data[1]
 
     async def async_will_remove_from_hass(self):
+        if self._flush_cancel is not None:
+            self._flush_cancel()
+            self._flush_cancel = None
         # Remove from internal structures
-        del self.coordinator.sensors[self._sensor["id"]]
+        del self.coordinator.sensors[self._sensor.id]
+
+
+class iAlarmMkHealthSensor(
+    CoordinatorEntity[iAlarmMkDataUpdateCoordinator], BinarySensorEntity
+):
+    """Battery or tamper state of a wireless device, read with GetWlsStatus."""
+
+    _KINDS = {
+        "battery": ("battery_low", BinarySensorDeviceClass.BATTERY),
+        "tamper": ("tamper", BinarySensorDeviceClass.TAMPER),
+    }
+
+    def __init__(self, coordinator: iAlarmMkDataUpdateCoordinator, sensor, kind):
+        super().__init__(coordinator)
+        self._sensor = sensor
+        self._key, self._attr_device_class = self._KINDS[kind]
+        self._attr_name = f"{sensor.name} {kind}"
+        self._attr_unique_id = f"{sensor.id}_{kind}"
+        self._attr_device_info = DeviceInfo(
+            manufacturer="iAlarm-MK",
+            name=f"Sensori iAlarm-MK",
+            connections={(device_registry.CONNECTION_NETWORK_MAC, coordinator.mac)},
+        )
+        self._result = None
+        self._available = None
+        self._attr_is_on = None
+        self._attr_extra_state_attributes = {"last_checked": None}
+        self._update_derived()
+
+    def _update_derived(self):
+        """Return True when the scan result or the availability changed."""
+        # Every scan stores a new result dict, so identity tells a change.
+        result = self.coordinator.health.results.get(self._sensor.index)
+        available = self.available
+        if result is self._result and available == self._available:
+            return False
+        self._available = available
+        if result is not self._result:
+            self._result = result
+            self._attr_is_on = None if result is None else result[self._key]
+            self._attr_extra_state_attributes = {
+                "last_checked": result["checked"] if result is not None else None
+            }
+        return True
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only when the health of the device changed."""
+        if self._update_derived():
+            super()._handle_coordinator_update()
+
+    @property
+    def available(self):
+        return super().available and self.coordinator.data[1]
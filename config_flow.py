@@ -24,7 +24,19 @@ from homeassistant.config_entries import OptionsFlowWithReload
 from homeassistant.core import callback
 
 
-from .const import DOMAIN, ATTR_CODE_DISARM_REQUIRED, ATTR_SENSOR_INSTALL_ENABLED
+from .const import (
+    DOMAIN,
+    ATTR_CODE_DISARM_REQUIRED,
+    ATTR_EVENT_COALESCE,
+    ATTR_EVENT_JOURNAL,
+    ATTR_FLAP_WINDOW_INTERIOR,
+    ATTR_FLAP_WINDOW_PERIMETER,
+    ATTR_FRAME_CAPTURE,
+    ATTR_HEALTH_SCAN_RATE,
+    ATTR_RELAY_MAX_RATE,
+    ATTR_SENSOR_INSTALL_ENABLED,
+    ATTR_STALENESS_LIMIT,
+)
 from .utils import async_get_ialarmmk_mac
 
 _LOGGER: Logger = logging.getLogger(__name__)
@@ -155,6 +167,24 @@ USER_SCHEMA = vol.Schema(
     {
         vol.Required(ATTR_SENSOR_INSTALL_ENABLED): bool,
         vol.Required(ATTR_CODE_DISARM_REQUIRED): bool,
+        vol.Optional(ATTR_RELAY_MAX_RATE): vol.All(
+            vol.Coerce(float), vol.Range(min=0.1)
+        ),
+        vol.Optional(ATTR_STALENESS_LIMIT): vol.All(
+            vol.Coerce(int), vol.Range(min=10)
+        ),
+        vol.Optional(ATTR_FRAME_CAPTURE): bool,
+        vol.Optional(ATTR_EVENT_COALESCE): bool,
+        vol.Optional(ATTR_EVENT_JOURNAL): bool,
+        vol.Optional(ATTR_HEALTH_SCAN_RATE): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=60)
+        ),
+        vol.Optional(ATTR_FLAP_WINDOW_INTERIOR): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=60000)
+        ),
+        vol.Optional(ATTR_FLAP_WINDOW_PERIMETER): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=60000)
+        ),
     }
 )
 
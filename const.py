@@ -1,6 +1,47 @@
 """Constants for the iAlarm-MK integration."""
 
 DOMAIN = "ialarm-mk"
+EVENT_IALARMMK = f"{DOMAIN}_event"
 ATTR_CODE_DISARM_REQUIRED = "code_disarm_required"
 ATTR_CODE_MODE_CHANGE_REQUIRED = "code_mode_change_required"
 ATTR_SENSOR_INSTALL_ENABLED = "sensor_install_enabled"
+ATTR_RELAY_MAX_RATE = "relay_max_rate"
+ATTR_STALENESS_LIMIT = "staleness_limit"
+ATTR_STALENESS = "staleness"
+ATTR_FRAME_CAPTURE = "frame_capture"
+ATTR_EVENT_COALESCE = "event_coalesce"
+ATTR_HEALTH_SCAN_RATE = "health_scan_rate"
+ATTR_FLAP_WINDOW_INTERIOR = "flap_window_interior"
+ATTR_FLAP_WINDOW_PERIMETER = "flap_window_perimeter"
+ATTR_SUPPRESSED_WRITES = "suppressed_writes"
+ATTR_EVENT_JOURNAL = "event_journal"
+
+DEFAULT_STALENESS_LIMIT = 300
+# Milliseconds between state writes of a disarmed zone, per zone class.
+# Zone states change at most once per 5 s poll, so windows up to 5000 ms
+# never hold anything back; the interior default spans two polls.
+DEFAULT_FLAP_WINDOW_INTERIOR = 10000
+DEFAULT_FLAP_WINDOW_PERIMETER = 0
+
+SERVICE_BYPASS_ZONES = "bypass_zones"
+ATTR_ZONES = "zones"
+ATTR_BYPASS = "bypass"
+
+SERVICE_ARM_BYPASS = "arm_bypass"
+ATTR_MODE = "mode"
+MODE_AWAY = "away"
+MODE_HOME = "home"
+
+SERVICE_EXPORT_CONFIG = "export_config"
+SERVICE_APPLY_CONFIG = "apply_config"
+SNAPSHOT_DIR = f"{DOMAIN}_snapshots"
+
+LOG_SYNC_INTERVAL = 60
+HEALTH_SCAN_INTERVAL = 30
+DEFAULT_HEALTH_SCAN_RATE = 6
+STANDBY_KEEPALIVE_INTERVAL = 15
+ZONE_STATS_SAVE_DELAY = 60
+STALENESS_REFRESH_INTERVAL = 30
+
+SERVICE_ZONE_STATISTICS = "zone_statistics"
+SERVICE_QUERY_JOURNAL = "query_journal"
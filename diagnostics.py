@@ -0,0 +1,35 @@
+"""Diagnostics support for iAlarm-MK."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_CODE, CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+TO_REDACT = {CONF_CODE, CONF_PASSWORD, CONF_USERNAME}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return the relay backpressure and event pipeline counters."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    ialarmmk = coordinator.ialarmmk
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": async_redact_data(entry.options, TO_REDACT),
+        },
+        "breaker": ialarmmk.breaker.state,
+        "staleness": coordinator.staleness,
+        "relay_limiter": ialarmmk.limiter.stats(),
+        "events": ialarmmk.events.stats(),
+        "poll": ialarmmk.poll_stats,
+        "command_latency": ialarmmk.standby.stats(),
+        "suppressed_writes": coordinator.suppressed_writes,
+    }
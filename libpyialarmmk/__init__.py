@@ -1,3 +1,35 @@
-# Copyright (C) 2022, ServiceA3
-
-from .ipyialarmmk import iAlarmMkInterface
+# Copyright (C) 2022, ServiceA3
+
+import importlib
+
+# Names are resolved on first access so that importing the package (from
+# the integration or its config flow) does not load the client and its
+# XML codec dependencies.
+_EXPORTS = {
+    "iAlarmMkInterface": ".ipyialarmmk",
+    "FrameCapture": ".capture",
+    "AlarmEvent": ".events",
+    "EventPipeline": ".events",
+    "TROUBLE_CIDS": ".health",
+    "HealthScanner": ".health",
+    "LogSync": ".logsync",
+    "read_snapshot": ".snapshot",
+    "PanelSnapshot": ".state",
+    "ZoneStats": ".stats",
+    "EventJournal": ".journal",
+    "Cid": ".pyialarmmk",
+    "ZoneStore": ".zones",
+}
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,168 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import re
+import struct
+import threading
+import time
+from collections import deque
+
+from .framer import HEADER_SIZE, TRAILER_SIZE, xor
+
+CHANNEL_COMMAND = 0
+CHANNEL_PUSH = 1
+
+DIRECTION_IN = 0
+DIRECTION_OUT = 1
+
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_BACKUP_COUNT = 3
+
+# Each record: wall clock timestamp, channel, direction, frame length, frame.
+_RECORD = struct.Struct("<dBBI")
+_MAGIC = b"iMKC\x01"
+
+_PWD = re.compile(rb"<Pwd>[^<]*</Pwd>")
+_REDACTED = b"<Pwd>PWD,0|</Pwd>"
+
+
+def redact(frame):
+    """Return frame with its Pwd values blanked, re-framed if it changed."""
+    head = frame[0:4]
+    if head not in (b"@ieM", b"@alA", b"!lmX") or len(frame) < HEADER_SIZE:
+        return frame
+    plain = head == b"!lmX"
+    payload = frame[HEADER_SIZE:-TRAILER_SIZE]
+    if not plain:
+        payload = xor(payload)
+    if b"<Pwd>" not in payload:
+        return frame
+    payload = _PWD.sub(_REDACTED, payload)
+    return b"".join(
+        (
+            head,
+            b"%04d" % len(payload),
+            frame[8:HEADER_SIZE],
+            payload if plain else xor(payload),
+            frame[-TRAILER_SIZE:],
+        )
+    )
+
+
+class FrameCapture:
+    """
+    Size bounded, rotating capture of raw relay frames.
+
+    record() only queues a copy of the frame; a writer thread redacts the
+    passwords (the login frame only carries the public XOR key) and writes
+    them, so capturing never does file I/O on the event loop. Files are
+    rotated like logging.handlers.RotatingFileHandler: when the current
+    file would exceed `max_bytes` it is renamed to `path.1`, older files
+    shift up and anything past `backup_count` is dropped.
+    """
+
+    def __init__(
+        self, path, max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._pending = deque()
+        self._wake = threading.Condition()
+        self._closed = False
+        self._file = None
+        self._size = 0
+        self._thread = threading.Thread(
+            target=self._run, name="iAlarmMK-Capture", daemon=True
+        )
+        self._thread.start()
+
+    def record(self, channel, direction, data):
+        entry = (time.time(), channel, direction, bytes(data))
+        with self._wake:
+            if self._closed:
+                return
+            self._pending.append(entry)
+            self._wake.notify()
+
+    def close(self):
+        """Write what is still queued and stop the writer thread."""
+        with self._wake:
+            self._closed = True
+            self._wake.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._wake:
+                while not self._pending and not self._closed:
+                    self._wake.wait()
+                closed = self._closed
+            self._write_batch()
+            if closed:
+                break
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write_batch(self):
+        pending = self._pending
+        while pending:
+            ts, channel, direction, data = pending.popleft()
+            data = redact(data)
+            if self._file is None:
+                self._open()
+            if self._size + _RECORD.size + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(_RECORD.pack(ts, channel, direction, len(data)))
+            self._file.write(data)
+            self._size += _RECORD.size + len(data)
+        if self._file is not None:
+            self._file.flush()
+
+    def _open(self):
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+        if self._size == 0:
+            self._file.write(_MAGIC)
+            self._size = len(_MAGIC)
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = "%s.%d" % (self.path, i)
+            if os.path.exists(src):
+                os.replace(src, "%s.%d" % (self.path, i + 1))
+        if self.backup_count > 0:
+            os.replace(self.path, "%s.1" % self.path)
+        else:
+            os.remove(self.path)
+        self._open()
+
+
+def read_capture(path):
+    """Yield (timestamp, channel, direction, frame) records of a capture file."""
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError("%s is not a frame capture" % path)
+        while True:
+            header = f.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                return
+            ts, channel, direction, length = _RECORD.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield ts, channel, direction, data
@@ -0,0 +1,157 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+SYS_FIELDS = (
+    "InDelay",
+    "OutDelay",
+    "AlarmTime",
+    "WlLoss",
+    "AcLoss",
+    "ComLoss",
+    "ArmVoice",
+    "ArmReport",
+    "ForceArm",
+    "DoorCheck",
+    "BreakCheck",
+    "AlarmLimit",
+)
+ZONE_FIELDS = ("Type", "Voice", "Name", "Bell")
+
+# reader: (setter, fields the setter writes, key of entries holding a single
+# value). List readers are written entry by entry, at the entry position.
+WRITERS = {
+    "GetSys": ("SetSys", SYS_FIELDS, None),
+    "GetZone": ("SetZone", ZONE_FIELDS, None),
+    "GetPhone": ("SetPhone", None, "Num"),
+    "GetRemote": ("SetRemote", None, "Code"),
+    "GetSensor": ("SetSensor", None, "Code"),
+    "GetSwitch": ("SetSwitch", None, "Code"),
+}
+RECORDS = frozenset(("GetSys",))
+# Only written on request: pairing codes re-enrol the wireless devices and
+# phone numbers redirect the alarm reports.
+PAIRING = frozenset(("GetRemote", "GetSensor", "GetSwitch"))
+PHONES = frozenset(("GetPhone",))
+
+DEFAULT_DEPTH = 8
+
+
+def _normalize(value):
+    # Live replies hold tuples and struct_time, snapshots hold lists.
+    return json.loads(json.dumps(value, default=str))
+
+
+def _fields(entry, fields, key):
+    if fields is None:
+        return entry.get(key) if isinstance(entry, dict) else entry
+    if not isinstance(entry, dict):
+        return None
+    return [entry.get(field) for field in fields]
+
+
+def writable(pairing=False, phones=False):
+    """Return the readers apply() may write, pairing codes and phones on request."""
+    return [
+        reader
+        for reader in WRITERS
+        if (pairing or reader not in PAIRING) and (phones or reader not in PHONES)
+    ]
+
+
+def diff(desired, live, readers=None):
+    """
+    Return the Set* calls turning the live configuration into desired.
+
+    Both are {reader: data} mappings as read_snapshot() returns them. Only
+    the given readers, writable() by default, are compared, and only the
+    fields their setter writes; desired record fields missing from the
+    snapshot keep their live value. Each call is a (setter, args, reader)
+    tuple.
+    """
+    if readers is None:
+        readers = writable()
+    calls = []
+    for reader in readers:
+        setter, fields, key = WRITERS[reader]
+        if reader not in desired or desired[reader] is None:
+            continue
+        want, have = desired[reader], live.get(reader)
+        if reader in RECORDS:
+            merged = dict(have or {})
+            merged.update((k, v) for k, v in want.items() if k in fields)
+            if _normalize(_fields(merged, fields, key)) != _normalize(
+                _fields(have, fields, key)
+            ):
+                calls.append((setter, tuple(merged.get(f) for f in fields), reader))
+            continue
+        have = have or []
+        for pos, entry in enumerate(want):
+            value = _fields(entry, fields, key)
+            current = _fields(have[pos], fields, key) if pos < len(have) else None
+            if value is None or _normalize(value) == _normalize(current):
+                continue
+            args = (pos, *value) if fields is not None else (pos, value)
+            calls.append((setter, args, reader))
+    return calls
+
+
+def apply(
+    client, desired, dry_run=False, depth=DEFAULT_DEPTH, pairing=False, phones=False
+):
+    """
+    Apply desired over the logged in client with the fewest writes.
+
+    The live values of the writable readers in desired are read pipelined,
+    only the differing Set* calls are sent, pipelined `depth` at a time,
+    then only the readers that were written are read again to verify. An
+    unchanged configuration costs the first reads alone. Pairing codes and
+    phone numbers are left alone, and listed as skipped, unless asked for.
+    """
+    allowed = writable(pairing, phones)
+    present = [reader for reader in WRITERS if desired.get(reader) is not None]
+    readers = [reader for reader in present if reader in allowed]
+    live = _read(client, readers, depth)
+    calls = diff(desired, live, readers)
+    result = {
+        "skipped": [reader for reader in present if reader not in allowed],
+        "reads": len(readers),
+        "planned": [[setter, list(args)] for setter, args, _ in calls],
+        "writes": 0,
+        "failed": [],
+    }
+    if dry_run or not calls:
+        return result
+
+    for i in range(0, len(calls), depth):
+        batch = calls[i : i + depth]
+        client.pipelined(*[(setter, args) for setter, args, _ in batch])
+        result["writes"] += len(batch)
+
+    touched = [reader for reader in readers if any(c[2] == reader for c in calls)]
+    live.update(_read(client, touched, depth))
+    result["reads"] += len(touched)
+    result["failed"] = [
+        [setter, list(args)] for setter, args, _ in diff(desired, live, touched)
+    ]
+    return result
+
+
+def _read(client, readers, depth):
+    live = {}
+    for i in range(0, len(readers), depth):
+        batch = readers[i : i + depth]
+        live.update(zip(batch, client.pipelined(*[(name, ()) for name in batch])))
+    return live
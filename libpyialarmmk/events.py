@@ -0,0 +1,292 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import inspect
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+
+from .pyialarmmk import SEVERITY_INFO, Cid
+
+
+@dataclass(frozen=True)
+class AlarmEvent:
+    """One Alarm frame received from the relay."""
+
+    cid: int
+    zone: int | None = None
+    name: str | None = None
+    content: str | None = None
+    panel_time: object = None
+    seq: int | None = None
+    received: float = field(default_factory=time.time)
+    count: int = 1
+    synthetic: bool = False
+    raw: dict = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def from_alarm(cls, alarm, synthetic=False):
+        def _int(value):
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+
+        return cls(
+            cid=_int(alarm.get("Cid")),
+            zone=_int(alarm.get("Zone")),
+            name=alarm.get("Name"),
+            content=alarm.get("Content"),
+            panel_time=alarm.get("Time"),
+            seq=_int(alarm.get("Seq")),
+            synthetic=synthetic,
+            raw=alarm,
+        )
+
+    @property
+    def identity(self):
+        """Key used to recognise frames re-sent by the relay, None if unknown."""
+        if self.seq is not None:
+            return ("seq", self.seq)
+        if self.panel_time is not None:
+            return (self.cid, self.zone, self.panel_time)
+        # Without Seq or Time a repeated Cid is a new event, e.g. arm,
+        # disarm and arm again.
+        return None
+
+    @property
+    def description(self):
+        info = Cid.get(self.cid)
+        return info.description if info is not None else None
+
+    @property
+    def severity(self):
+        info = Cid.get(self.cid)
+        return info.severity if info is not None else SEVERITY_INFO
+
+    @property
+    def coalesce_key(self):
+        return (self.cid, self.zone)
+
+
+class _Subscriber:
+    def __init__(self, callback, maxsize):
+        self.callback = callback
+        self.is_coroutine = inspect.iscoroutinefunction(callback)
+        self.queue = asyncio.Queue(maxsize)
+        self.task = None
+        self.delivered = 0
+        self.dropped = 0
+        self.high_water = 0
+
+
+class EventPipeline:
+    """
+    Ordered, deduplicated fan-out of AlarmEvents.
+
+    publish() is non-blocking and meant to be called from the push protocol
+    on the event loop. A single dispatcher drops frames re-sent within
+    `dedup_window` seconds and, when `coalesce` is enabled and at least
+    `storm_threshold` events are backlogged, merges events with the same Cid
+    and zone into one carrying a `count`. Each subscriber gets its own
+    bounded queue so a slow consumer only loses its own oldest events.
+    """
+
+    def __init__(
+        self,
+        maxsize=256,
+        dedup_window=5.0,
+        coalesce=True,
+        storm_threshold=8,
+        logger=None,
+    ):
+        self.maxsize = maxsize
+        self.dedup_window = dedup_window
+        self.coalesce = coalesce
+        self.storm_threshold = storm_threshold
+        self.logger = logger
+
+        self._queue = None
+        self._task = None
+        self._seen = OrderedDict()
+        self._subscribers = []
+
+        self.published = 0
+        self.duplicates = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.high_water = 0
+
+    def subscribe(self, callback, maxsize=None):
+        """Register a sync or async callback, return a function removing it."""
+        sub = _Subscriber(callback, maxsize or self.maxsize)
+        self._subscribers.append(sub)
+        if self._task is not None:
+            sub.task = asyncio.create_task(self._deliver(sub))
+
+        def unsubscribe():
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+                if sub.task is not None:
+                    sub.task.cancel()
+
+        return unsubscribe
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(self.maxsize)
+        self._task = asyncio.create_task(self._dispatch())
+        for sub in self._subscribers:
+            sub.task = asyncio.create_task(self._deliver(sub))
+
+    def stop(self):
+        for task in [self._task] + [sub.task for sub in self._subscribers]:
+            if task is not None:
+                task.cancel()
+        self._task = None
+        # Later publishes are delivered inline instead of queued for no one.
+        self._queue = None
+        for sub in self._subscribers:
+            sub.task = None
+
+    def publish(self, alarm, synthetic=False):
+        """Queue a raw Alarm dict or an AlarmEvent for dispatch."""
+        if not alarm:
+            return
+        event = (
+            alarm
+            if isinstance(alarm, AlarmEvent)
+            else AlarmEvent.from_alarm(alarm, synthetic)
+        )
+        self.published += 1
+        if self._queue is None:
+            # Not started: deliver inline so callers never lose events.
+            if not self._dedup(event):
+                self._fan_out([event])
+            return
+        if not self._put(self._queue, event):
+            self.dropped += 1
+        self.high_water = max(self.high_water, self._queue.qsize())
+
+    def stats(self):
+        return {
+            "published": self.published,
+            "duplicates": self.duplicates,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "high_water": self.high_water,
+            "subscribers": [
+                {
+                    "delivered": sub.delivered,
+                    "dropped": sub.dropped,
+                    "queued": sub.queue.qsize(),
+                    "high_water": sub.high_water,
+                }
+                for sub in self._subscribers
+            ],
+        }
+
+    def _put(self, queue, event):
+        """Put without blocking, dropping the oldest entry when full."""
+        try:
+            queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            queue.get_nowait()
+            queue.put_nowait(event)
+            return False
+
+    def _is_duplicate(self, event):
+        now = time.monotonic()
+        while self._seen and next(iter(self._seen.values())) < now:
+            self._seen.popitem(last=False)
+        key = event.identity
+        if key is None:
+            return False
+        if key in self._seen:
+            return True
+        self._seen[key] = now + self.dedup_window
+        return False
+
+    def _coalesce(self, events):
+        # Merged events take the position of their last occurrence so the
+        # final state after the batch is unchanged.
+        merged = {}
+        for index, event in enumerate(events):
+            key = event.coalesce_key
+            previous = merged.get(key)
+            if previous is not None:
+                event = replace(event, count=previous[1].count + event.count)
+                self.coalesced += 1
+            merged[key] = (index, event)
+        return [event for _, event in sorted(merged.values(), key=lambda x: x[0])]
+
+    async def _dispatch(self):
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            batch = [event for event in batch if not self._dedup(event)]
+            if self.coalesce and len(batch) >= self.storm_threshold:
+                batch = self._coalesce(batch)
+            self._fan_out(batch)
+
+    def _dedup(self, event):
+        if event.synthetic or not self._is_duplicate(event):
+            return False
+        self.duplicates += 1
+        return True
+
+    def _fan_out(self, events):
+        for sub in list(self._subscribers):
+            for event in events:
+                if sub.task is None:
+                    self._call(sub, event)
+                    continue
+                if not self._put(sub.queue, event):
+                    sub.dropped += 1
+                    self.dropped += 1
+                sub.high_water = max(sub.high_water, sub.queue.qsize())
+
+    async def _deliver(self, sub):
+        while True:
+            event = await sub.queue.get()
+            if sub.is_coroutine:
+                try:
+                    await sub.callback(event)
+                    sub.delivered += 1
+                except Exception:
+                    self._log_error(sub)
+            else:
+                self._call(sub, event)
+
+    def _call(self, sub, event):
+        try:
+            if sub.is_coroutine:
+                asyncio.ensure_future(sub.callback(event))
+            else:
+                sub.callback(event)
+            sub.delivered += 1
+        except Exception:
+            self._log_error(sub)
+
+    def _log_error(self, sub):
+        if self.logger is not None:
+            self.logger.debug(
+                "iAlarm-MK event subscriber %s failed", sub.callback, exc_info=True
+            )
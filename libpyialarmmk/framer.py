@@ -0,0 +1,106 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+HEADER_SIZE = 16
+TRAILER_SIZE = 4
+
+_KEY = bytes.fromhex(
+    "0c384e4e62382d620e384e4e44382d300f382b382b0c5a6234384e304e4c372b10535a0c20432d171142444e58422c421157322a204036172056446262382b5f0c384e4e62382d620e385858082e232c0f382b382b0c5a62343830304e2e362b10545a0c3e432e1711384e625824371c1157324220402c17204c444e624c2e12"
+)
+_KEY_INT = int.from_bytes(_KEY, "little")
+
+
+def xor_into(buf, start, data, begin=0, end=None):
+    """
+    Write data[begin:end] XORed with the protocol key into buf at start.
+
+    The key is applied one key length at a time, as big-integer operations,
+    so the temporaries stay key sized whatever the length of the frame.
+    data may be buf itself, to XOR a range in place.
+    """
+    if end is None:
+        end = len(data)
+    size = len(_KEY)
+    for pos in range(begin, end, size):
+        n = min(size, end - pos)
+        key = _KEY_INT if n == size else _KEY_INT & ((1 << 8 * n) - 1)
+        at = start + pos - begin
+        buf[at : at + n] = (
+            int.from_bytes(data[pos : pos + n], "little") ^ key
+        ).to_bytes(n, "little")
+
+
+def xor(data):
+    """Apply the protocol XOR key, returning a new bytearray."""
+    out = bytearray(len(data))
+    xor_into(out, 0, data)
+    return out
+
+
+class Framer:
+    """
+    Frame assembly and reception over reusable buffers.
+
+    pack() writes header, XORed payload and trailer into one buffer and
+    returns a view on it, valid until the next pack(). recv() reads exactly
+    one frame, following the length in its header, so short reads and
+    replies longer than one segment are handled; decode() then XORs its
+    payload in place.
+    """
+
+    def __init__(self):
+        self._out = bytearray(512)
+        self._in = bytearray(1024)
+        # Views are kept with their buffer, slicing one is cheaper than
+        # creating it for every frame.
+        self._out_view = memoryview(self._out)
+        self._in_view = memoryview(self._in)
+
+    def pack(self, payload, seq, head=b"@ieM"):
+        n = len(payload)
+        size = HEADER_SIZE + n + TRAILER_SIZE
+        if len(self._out) < size:
+            self._out = bytearray(size)
+            self._out_view = memoryview(self._out)
+        buf = self._out
+        buf[0:4] = head
+        buf[4:HEADER_SIZE] = b"%04d%04d0000" % (n, seq)
+        xor_into(buf, HEADER_SIZE, payload)
+        buf[HEADER_SIZE + n : size] = b"%04d" % seq
+        return self._out_view[:size]
+
+    def recv(self, sock):
+        self._recv_into(sock, 0, HEADER_SIZE)
+        size = HEADER_SIZE + int(self._in[4:8]) + TRAILER_SIZE
+        if len(self._in) < size:
+            grown = bytearray(size)
+            grown[:HEADER_SIZE] = self._in[:HEADER_SIZE]
+            self._in = grown
+            self._in_view = memoryview(self._in)
+        self._recv_into(sock, HEADER_SIZE, size)
+        return self._in_view[:size]
+
+    def decode(self, frame):
+        """Return the payload of the frame recv() returned, XORed in place."""
+        end = len(frame) - TRAILER_SIZE
+        xor_into(self._in, HEADER_SIZE, self._in, HEADER_SIZE, end)
+        return str(self._in_view[HEADER_SIZE:end], "utf-8")
+
+    def _recv_into(self, sock, start, end):
+        view = self._in_view
+        while start < end:
+            n = sock.recv_into(view[start:end])
+            if n == 0:
+                raise ConnectionResetError("Connection closed by remote host")
+            start += n
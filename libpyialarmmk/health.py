@@ -0,0 +1,81 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import time
+from collections import deque
+
+# Cids reporting a device trouble, scanned ahead of the rotation.
+TROUBLE_CIDS = frozenset((1137, 1381, 1384, 3381, 3384))
+
+DEFAULT_WINDOW = 4
+DEFAULT_MAX_PER_MINUTE = 6
+
+
+class HealthScanner:
+    """
+    Rotating GetWlsStatus scanner of the wireless devices.
+
+    Each cycle checks at most `window` devices over one session: devices
+    flagged by a trouble Cid first, then the next ones of the rotation. The
+    login and every GetWlsStatus count against `max_per_minute`.
+    """
+
+    def __init__(
+        self, devices, window=DEFAULT_WINDOW, max_per_minute=DEFAULT_MAX_PER_MINUTE
+    ):
+        self.devices = list(devices)
+        self.window = window
+        self.max_per_minute = max_per_minute
+        self.results = {}
+        self._urgent = deque()
+        self._cursor = 0
+        self._sent = deque()
+
+    def prioritize(self, num):
+        if num in self.devices and num not in self._urgent:
+            self._urgent.append(num)
+
+    def next_batch(self):
+        """Return the devices to check this cycle, empty if over budget."""
+        now = time.monotonic()
+        while self._sent and self._sent[0] <= now - 60:
+            self._sent.popleft()
+        # One request of the budget goes to the login.
+        size = min(self.window, self.max_per_minute - len(self._sent) - 1)
+        if size <= 0 or not self.devices:
+            return []
+
+        batch = []
+        while self._urgent and len(batch) < size:
+            batch.append(self._urgent.popleft())
+        for _ in range(len(self.devices)):
+            if len(batch) >= size:
+                break
+            num = self.devices[self._cursor]
+            self._cursor = (self._cursor + 1) % len(self.devices)
+            if num not in batch:
+                batch.append(num)
+
+        self._sent.extend([now] * (len(batch) + 1))
+        return batch
+
+    def record(self, num, status):
+        if not status or status.get("Err"):
+            return
+        self.results[num] = {
+            "battery_low": bool(status.get("Bat")),
+            "tamper": bool(status.get("Tamp")),
+            "status": status.get("Status"),
+            "checked": time.time(),
+        }
@@ -12,9 +12,38 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from .pyialarmmk import iAlarmMkClient, iAlarmMkPushClient
+from .pyialarmmk import Cid, ResponseError, iAlarmMkClient, iAlarmMkPushClient
+from .breaker import CircuitBreaker
+from .standby import WarmStandby
+from .snapshot import write_snapshot
+from .state import SnapshotPublisher
+from .stats import ZoneStats
+from .journal import KIND_ALARM, KIND_COMMAND, KIND_STATUS
+from .switches import load_switches, update_switches
+from . import configdiff
+from .events import AlarmEvent, EventPipeline
+from .zones import (
+    covering_pages,
+    ZONE_ALARM,
+    ZONE_BYPASS,
+    ZONE_FAULT,
+    ZONE_IN_USE,
+    ZONE_LOSS,
+    ZONE_LOW_BATTERY,
+    ZONE_NOT_USED,
+    ZoneStore,
+)
+from .limiter import (
+    PRIORITY_BULK,
+    PRIORITY_COMMAND,
+    PRIORITY_POLL,
+    PRIORITY_PUSH,
+    get_limiter,
+)
 import asyncio
 import logging
+import time
+from contextlib import contextmanager
 from logging import Logger
 
 class iAlarmMkInterface:
@@ -30,13 +59,18 @@ class iAlarmMkInterface:
     ALARM_ARMING = 5
     UNAVAILABLE = 6
 
-    ZONE_NOT_USED = 0
-    ZONE_IN_USE = 1 << 0
-    ZONE_ALARM = 1 << 1
-    ZONE_BYPASS = 1 << 2
-    ZONE_FAULT = 1 << 3
-    ZONE_LOW_BATTERY = 1 << 4
-    ZONE_LOSS = 1 << 5
+    ZONE_NOT_USED = ZONE_NOT_USED
+    ZONE_IN_USE = ZONE_IN_USE
+    ZONE_ALARM = ZONE_ALARM
+    ZONE_BYPASS = ZONE_BYPASS
+    ZONE_FAULT = ZONE_FAULT
+    ZONE_LOW_BATTERY = ZONE_LOW_BATTERY
+    ZONE_LOSS = ZONE_LOSS
+
+    # Report Cid synthesized when a reconnect reveals a missed status change.
+    # A triggered panel does not say which zone went off, so it is reported
+    # as a burglary; arming has no report of its own until it completes.
+    STATUS_CID = {ARMED_AWAY: 3401, DISARMED: 1401, ARMED_STAY: 3441, TRIGGERED: 1132}
 
     IALARMMK_P2P_DEFAULT_PORT = 18034
     IALARMMK_P2P_DEFAULT_HOST = "47.91.74.102"
@@ -50,6 +84,11 @@ class iAlarmMkInterface:
         query_sensor: bool = False,
         hass=None,
         logger : Logger =None,
+        max_rate: float = None,
+        capture=None,
+        coalesce_events: bool = True,
+        zone_stats: ZoneStats = None,
+        journal=None,
     ):
         self.threadID = "iAlarmMK-Thread"
         self.host = iAlarmMkInterface.IALARMMK_P2P_DEFAULT_HOST
@@ -58,7 +97,18 @@ class iAlarmMkInterface:
         self.pwd = pwd
         self.query_sensor = query_sensor
 
-        self.ialarmmkClient = iAlarmMkClient(self.host, self.port, self.uid, self.pwd)
+        self.limiter = get_limiter(self.uid, max_rate)
+        self.capture = capture
+        self.journal = journal
+        self.ialarmmkClient = iAlarmMkClient(
+            self.host,
+            self.port,
+            self.uid,
+            self.pwd,
+            self.limiter,
+            PRIORITY_COMMAND,
+            self.capture,
+        )
 
         self.callback = None
         self.polling_callback = None
@@ -67,19 +117,59 @@ class iAlarmMkInterface:
         
         self.subscribed = False
         self.pollingActive = False
+
+        self.breaker = CircuitBreaker()
+        self.standby = WarmStandby(self._command_client, logger=logger)
+        self.last_success = None
+        self.last_push = None
+        self._probe_task = None
+        self.last_gap = None
+
+        self.events = EventPipeline(coalesce=coalesce_events, logger=logger)
+        self.events.subscribe(self._handle_event)
         
         self.logger.debug("iAlarm-MK Interface initialized")
 
-        self.sensors = {}
+        self.sensors = ZoneStore()
         self.sensor_number = 0
         self.sensors_status = []
+        self.switches = {}
+        # GetByWay Offsets polled, None to read the whole vector.
+        self.byway_pages = None
+        self.poll_stats = None
+        # Replies of the last poll; cleared whenever the zones or switches
+        # are written outside a poll, or a hit could hide a real change.
+        self._poll_cache = {}
+        self.zone_stats = zone_stats if zone_stats is not None else ZoneStats()
+        self._publisher = SnapshotPublisher(self.zone_stats.feed)
+
+        self.status = self.UNAVAILABLE
+        
+        # self._get_sensors_status()
+
+    def initialize(self):
+        """Read the status, zones and outputs of the panel, blocking.
 
+        Every request waits for a limiter token, so this runs in an executor
+        and never from the event loop.
+        """
         self._get_status()
-        
         if self.query_sensor:
             self._init_sensors()
-        
-        # self._get_sensors_status()
+        self.discover_switches()
+
+    @property
+    def snapshot(self):
+        """The last published PanelSnapshot, never modified in place."""
+        return self._publisher.current
+
+    def publish(self):
+        """Publish the live status, zones and switches as a new snapshot."""
+        return self._publisher.publish(
+            self.status,
+            self.sensors.states,
+            [(index, switch.is_on) for index, switch in self.switches.items()],
+        )
 
     def set_callback(self, callback):
         self.callback = callback
@@ -93,39 +183,138 @@ class iAlarmMkInterface:
         
         self.subscribed = True
         disconnect_time = 60 * 5
+        retry_delay = 1
+        gap_start = None
         self.logger.debug("iAlarm-MK Subscribe started")
+        self.events.start()
         
         while True:
             loop = asyncio.get_running_loop()
             on_con_lost = loop.create_future()
-            transport, protocol = await loop.create_connection(
-                lambda: iAlarmMkPushClient(
+            try:
+                transport, protocol = await loop.create_connection(
+                    lambda: iAlarmMkPushClient(
+                        self.host,
+                        self.port,
+                        self.uid,
+                        self._on_alarm,
+                        loop,
+                        on_con_lost,
+                        self.logger,
+                        self._push_alive,
+                        self.capture,
+                    ),
                     self.host,
                     self.port,
-                    self.uid,
-                    self.set_status,
-                    loop,
-                    on_con_lost,
-                    self.logger,
-                ),
-                self.host,
-                self.port,
-            )
+                )
+            except OSError:
+                self.logger.debug("iAlarm-MK Push connection failed", exc_info=True)
+                if gap_start is None:
+                    gap_start = time.time()
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 60)
+                continue
+
+            retry_delay = 1
+            if gap_start is not None:
+                self.last_gap = (gap_start, time.time())
+                await self._reconcile(*self.last_gap)
+                gap_start = None
 
             try:
-                await asyncio.sleep(disconnect_time)
+                await asyncio.wait([on_con_lost], timeout=disconnect_time)
             except Exception as e:
                 self.logger.debug(e)
                 pass
             finally:
                 transport.close()
                 transport = None
-                self.subscribed = False
-                self.logger.debug("iAlarm-MK Subscribe Timeout, reconnecting...")
+                gap_start = time.time()
+                if on_con_lost.done():
+                    self.logger.debug("iAlarm-MK Push connection lost, reconnecting...")
+                else:
+                    self.logger.debug("iAlarm-MK Subscribe Timeout, reconnecting...")
                 await asyncio.sleep(1)
                 
         self.logger.debug("iAlarm-MK Subscribe stopped")
 
+    async def _reconcile(self, gap_start, gap_end):
+        """Publish the transitions missed while the push channel was down.
+
+        One session reads GetAlarmStatus, GetByWay and the newest GetEvents
+        page. The DevStatus read back becomes the current status; events
+        stamped strictly inside the gap are replayed as history, and a status
+        change not explained by them is synthesized from its report Cid.
+        Synthetic events bypass the pipeline dedup, so entries stamped before
+        the gap, already delivered by push, are never replayed.
+        """
+        try:
+            status, states, entries = await asyncio.to_thread(self._read_snapshot)
+        except:
+            self.breaker.record_failure()
+            self.logger.debug("iAlarm-MK Unable to reconcile push gap", exc_info=True)
+            return
+        self._mark_success()
+
+        if states is not None:
+            self.sensors.update(states)
+            self._poll_cache.clear()
+            self.publish()
+            if self.polling_callback is not None:
+                self.polling_callback()
+
+        missed = []
+        for entry in entries:
+            stamp = entry.get("Time") if isinstance(entry, dict) else None
+            if not isinstance(stamp, time.struct_time):
+                continue
+            if gap_start < time.mktime(stamp) <= gap_end:
+                missed.append((time.mktime(stamp), entry))
+
+        expected = self.status
+        if status is not None:
+            await self.async_set_status(status)
+
+        for _, entry in sorted(missed, key=lambda item: item[0]):
+            alarm = dict(entry)
+            alarm.setdefault("Cid", entry.get("Event"))
+            try:
+                info = Cid.get(int(alarm["Cid"]))
+            except (TypeError, ValueError):
+                continue
+            if info is not None and info.status is not None:
+                expected = info.status
+            self.events.publish(alarm, synthetic=True)
+
+        if status is not None and status != expected and status in self.STATUS_CID:
+            self.events.publish({"Cid": self.STATUS_CID[status]}, synthetic=True)
+
+        self.logger.debug(
+            "iAlarm-MK Reconciled %.1fs push gap, %d missed events",
+            gap_end - gap_start,
+            len(missed),
+        )
+
+    def _read_snapshot(self):
+        client = iAlarmMkClient(
+            self.host,
+            self.port,
+            self.uid,
+            self.pwd,
+            self.limiter,
+            PRIORITY_PUSH,
+            self.capture,
+        )
+        client.login()
+        status = client.GetAlarmStatus().get("DevStatus")
+        states = client.GetByWay() if self.sensor_number > 0 else None
+        try:
+            _, entries = client.GetEventsPage(0)
+        except ResponseError:
+            entries = []
+        client.logout()
+        return status, states, entries
+
     async def polling(self):
         """Periodically poll the alarm sensors and invoke the polling callback if set.
 
@@ -151,27 +340,99 @@ class iAlarmMkInterface:
                 self.logger.debug("iAlarm-MK Polling exception")
                 
     async def polling_once(self):
-        """Poll the alarm sensors once to update their status."""
+        """Poll the alarm sensors once to update their status.
+
+        While the circuit breaker is open no connection is attempted; a
+        single background probe is started each time the backoff expires.
+        Returns True when a zone or switch state changed.
+        """
+        if self.breaker.is_open:
+            if (
+                self._probe_task is None or self._probe_task.done()
+            ) and self.breaker.allow():
+                self.logger.debug("iAlarm-MK Probing relay")
+                self._probe_task = asyncio.create_task(self._probe())
+            return False
+
+        if not self._poll_calls():
+            self.logger.debug("iAlarm-MK Polling stopped")
+            return False
+
+        return await self._poll_sensors()
+
+    async def _probe(self):
+        """Half-open probe: the poll itself, or a GetAlarmStatus without one."""
+        if self._poll_calls():
+            return await self._poll_sensors()
+        await asyncio.to_thread(self._get_status)
+        self.publish()
+        return False
+
+    def _poll_calls(self):
+        """Return the readers of a poll; switches share the zone session."""
+        calls = []
+        if self.query_sensor and self.sensor_number > 0:
+            if self.byway_pages:
+                calls.extend(("GetByWayPage", (offset,)) for offset in self.byway_pages)
+            else:
+                calls.append(("GetByWay", ()))
+        if self.switches:
+            calls.append(("GetSwitch", ()))
+        return calls
+
+    async def _poll_sensors(self):
         try:
-            if self.query_sensor is False or self.sensor_number == 0:
-                self.logger.debug("iAlarm-MK Polling stopped")
-                return
-        
-            client = iAlarmMkClient(self.host, self.port, self.uid, self.pwd)
+            calls = self._poll_calls()
+            client = iAlarmMkClient(
+                self.host,
+                self.port,
+                self.uid,
+                self.pwd,
+                self.limiter,
+                PRIORITY_POLL,
+                self.capture,
+            )
+            client.cache = self._poll_cache
             await asyncio.to_thread(client.login)
             #await asyncio.sleep(0.5)
-            states = await asyncio.to_thread(client.GetByWay)
+            replies = await asyncio.to_thread(client.pipelined, *calls)
             #await asyncio.sleep(0.5)
             await asyncio.to_thread(client.logout)
             #await asyncio.sleep(0.5)
-            for sensor_id, sensor in self.sensors.items():
-                self.sensors[sensor_id]["state"] = states[sensor["index"]]
+            changed = False
+            for (name, args), reply, unchanged in zip(
+                calls, replies, client.unchanged
+            ):
+                if unchanged:
+                    # Identical to the last poll, not even parsed.
+                    continue
+                if name == "GetByWayPage":
+                    changed |= bool(self.sensors.update_range(args[0], reply[1]))
+                elif name == "GetByWay":
+                    changed |= bool(self.sensors.update(reply))
+                else:
+                    changed |= update_switches(self.switches, reply)
+            self.poll_stats = {
+                "requests": len(calls),
+                "bytes": client.rx_bytes,
+                "parse_ms": round(client.parse_time * 1000, 2),
+                "unchanged": sum(client.unchanged),
+            }
+            self.logger.debug("iAlarm-MK Poll %s", self.poll_stats)
+            if changed:
+                self.publish()
                 
             del client
-            del states
+            del replies
+            self._mark_success()
             await asyncio.sleep(0)
+            return changed
         except:
+            # Replies may have been cached without reaching the store.
+            self._poll_cache.clear()
+            self.breaker.record_failure()
             self.logger.debug("iAlarm-MK Unable to poll once", exc_info=True)
+            return False
         
         
         #self.logger.debug("iAlarm-MK polling once started")
@@ -186,124 +447,380 @@ class iAlarmMkInterface:
         #else:
         #    self.logger.debug("iAlarm-MK No sensors to poll")
 
+    def _command_client(self):
+        return iAlarmMkClient(
+            self.host,
+            self.port,
+            self.uid,
+            self.pwd,
+            self.limiter,
+            PRIORITY_COMMAND,
+            self.capture,
+        )
+
+    def disconnect(self):
+        self.standby.close()
+
+    @contextmanager
+    def _priority(self, priority):
+        """Send the requests of the shared client with the given priority."""
+        previous = self.ialarmmkClient.priority
+        self.ialarmmkClient.priority = priority
+        try:
+            yield self.ialarmmkClient
+        finally:
+            self.ialarmmkClient.priority = previous
+
     def _get_status(self):
         try:
-            self.ialarmmkClient.login()
-            self.status = self.ialarmmkClient.GetAlarmStatus().get("DevStatus")
-            self.ialarmmkClient.logout()
+            with self._priority(PRIORITY_POLL):
+                self.ialarmmkClient.login()
+                self.status = self.ialarmmkClient.GetAlarmStatus().get("DevStatus")
+                self.ialarmmkClient.logout()
+            self._mark_success()
         except:
-            self.status = self.UNAVAILABLE
-            pass
+            self.breaker.record_failure()
+            if self.last_success is None:
+                self.status = self.UNAVAILABLE
 
     def get_status(self):
         return self.status
 
+    def _mark_success(self):
+        self.breaker.record_success()
+        self.last_success = time.monotonic()
+
+    def _push_alive(self):
+        self.last_push = time.monotonic()
+
+    def staleness(self):
+        """Return the age in seconds of the last known state, None if never known."""
+        last = max(self.last_success or 0.0, self.last_push or 0.0)
+        if last == 0.0:
+            return None
+        return time.monotonic() - last
+
     def get_sensors(self):
         return self.sensors
 
     def _init_sensors(self):
         try:
-            self.ialarmmkClient.login()
-            sensors = self.ialarmmkClient.GetSensor()
-            zones = self.ialarmmkClient.GetZone()
-            states = self.ialarmmkClient.GetByWay()
-            self.ialarmmkClient.logout()
-            for index, s in enumerate(sensors):
-                if s and len(s) > 0:
-                    self.sensors[s] = {
-                        "id": s,
-                        "zone": zones[index],
-                        "state": states[index],  # or False if unknown
-                        "index": index,
-                    }
-                    self.sensor_number += 1
+            with self._priority(PRIORITY_BULK):
+                self.ialarmmkClient.login()
+                sensors = self.ialarmmkClient.GetSensor()
+                zones = self.ialarmmkClient.GetZone()
+                total, first = self.ialarmmkClient.GetByWayPage(0)
+                for index, s in enumerate(sensors):
+                    if s and len(s) > 0:
+                        self.sensors.add(s, index, zones[index])
+                        self.sensor_number += 1
+                self.sensors.update_range(0, first)
+                # Only the pages holding configured zones are polled.
+                page_size = len(first) if total > len(first) else None
+                self.byway_pages = covering_pages(
+                    [zone.index for zone in self.sensors.values()], page_size
+                )
+                rest = [offset for offset in self.byway_pages if offset != 0]
+                if rest:
+                    pages = self.ialarmmkClient.pipelined(
+                        *[("GetByWayPage", (offset,)) for offset in rest]
+                    )
+                    for offset, (_, states) in zip(rest, pages):
+                        self.sensors.update_range(offset, states)
+                self.ialarmmkClient.logout()
                     
             self.query_sensor = self.sensor_number > 0
         except Exception as e:
             self.logger.debug("iAlarm-MK Unable to initialize sensors", exc_info=True)
 
+    def discover_switches(self):
+        """Read the paired outputs over one session, blocking.
+
+        Only entry setup needs them; interfaces built to validate an
+        account skip the extra login.
+        """
+        try:
+            with self._priority(PRIORITY_BULK):
+                self.ialarmmkClient.login()
+                switches, infos = self.ialarmmkClient.pipelined(
+                    ("GetSwitch", ()), ("GetSwitchInfo", ())
+                )
+                self.ialarmmkClient.logout()
+            self.switches = load_switches(switches, infos)
+            self._poll_cache.clear()
+        except:
+            self.logger.debug("iAlarm-MK Unable to initialize switches", exc_info=True)
+        self.publish()
+
+    def set_switch(self, index, on):
+        """Drive an output through the warm command session."""
+        try:
+            with self._journaled("set_switch", switch=index, on=bool(on)):
+                self.standby.run(lambda client: client.OpSwitch(index, on))
+        except:
+            self.breaker.record_failure()
+            self.logger.debug("iAlarm-MK Unable to operate switch", exc_info=True)
+            raise
+        self._mark_success()
+        self.switches[index].is_on = bool(on)
+        self._poll_cache.clear()
+        self.publish()
+
     def _get_sensors_status(self):
         try:
-            self.ialarmmkClient.login()
-            states = self.ialarmmkClient.GetByWay()
-            self.ialarmmkClient.logout()
+            with self._priority(PRIORITY_POLL):
+                self.ialarmmkClient.login()
+                states = self.ialarmmkClient.GetByWay()
+                self.ialarmmkClient.logout()
 
-            for sensor_id, sensor in self.sensors.items():
-                self.sensors[sensor_id]["state"] = states[sensor["index"]]
+            self.sensors.update(states)
+            self._poll_cache.clear()
         except:
             self.logger.debug("iAlarm-MK Unable to get sensors status", exc_info=True)
             return None
 
+    def read_log(self, log_sync):
+        """Return the panel log entries added since the last sync."""
+        if self.breaker.is_open:
+            return []
+        client = iAlarmMkClient(
+            self.host,
+            self.port,
+            self.uid,
+            self.pwd,
+            self.limiter,
+            PRIORITY_BULK,
+            self.capture,
+        )
+        try:
+            client.login()
+            entries = log_sync.sync(client)
+            client.logout()
+            return entries
+        except:
+            self.logger.debug("iAlarm-MK Unable to read log", exc_info=True)
+            return []
+
+    def scan_health(self, scanner):
+        """Check the next window of wireless devices over one session."""
+        if self.breaker.is_open:
+            return False
+        batch = scanner.next_batch()
+        if not batch:
+            return False
+        client = iAlarmMkClient(
+            self.host,
+            self.port,
+            self.uid,
+            self.pwd,
+            self.limiter,
+            PRIORITY_BULK,
+            self.capture,
+        )
+        try:
+            client.login()
+            for num in batch:
+                scanner.record(num, client.GetWlsStatus(num))
+            client.logout()
+            return True
+        except:
+            self.logger.debug("iAlarm-MK Unable to scan devices health", exc_info=True)
+            return False
+
+    def export_config(self, path, meta=None):
+        """Write a snapshot of the whole panel configuration, over one session."""
+        client = iAlarmMkClient(
+            self.host,
+            self.port,
+            self.uid,
+            self.pwd,
+            self.limiter,
+            PRIORITY_BULK,
+            self.capture,
+        )
+        client.login()
+        try:
+            return write_snapshot(client, path, meta)
+        finally:
+            client.logout()
+
+    def apply_config(self, config, dry_run=False, pairing=False, phones=False):
+        """Write only the settings of config that differ from the panel."""
+        client = iAlarmMkClient(
+            self.host,
+            self.port,
+            self.uid,
+            self.pwd,
+            self.limiter,
+            PRIORITY_BULK,
+            self.capture,
+        )
+        client.login()
+        try:
+            return configdiff.apply(
+                client, config, dry_run, pairing=pairing, phones=phones
+            )
+        finally:
+            client.logout()
+
     def get_sensor_status(self, id):
         try:
-            return self.sensors[id]["state"]
+            return self.sensors.state(self.sensors[id].index)
         except:
             return None
 
     def is_sensor_open(self, id):
         try:
-            status = self.sensors[id]["state"]
-            return status in (9, 11, 17, 27)
+            return self.sensors.is_open(self.sensors[id].index)
         except:
             return None
 
+    def _handle_event(self, event: AlarmEvent):
+        # Synthetic events are history replayed after a push gap, the status
+        # was already taken from the panel when they were published.
+        if event.synthetic:
+            return
+        self.set_status(event.raw)
+
+    def _on_alarm(self, alarm):
+        self._journal(KIND_ALARM, alarm)
+        self.events.publish(alarm)
+
+    def _journal(self, kind, data):
+        if self.journal is not None:
+            self.journal.record(kind, data)
+
+    @contextmanager
+    def _journaled(self, command, **data):
+        """Journal a command with its outcome; the body may add to data."""
+        try:
+            yield data
+        except BaseException:
+            self._journal(KIND_COMMAND, {"command": command, "ok": False, **data})
+            raise
+        self._journal(KIND_COMMAND, {"command": command, "ok": True, **data})
+
     def set_status(self, status):
-        new_status = int(status.get("Cid"))
-
-        if new_status == 1401:
-            self.status = 1
-        elif new_status == 1406:
-            self.status = 1
-        elif new_status == 3401:
-            self.status = 0
-        elif new_status == 3441:
-            self.status = 2
-        elif new_status == 1100 or new_status == 1101 or new_status == 1120:
-            self.status = 4
-        elif new_status == 1131 or new_status == 1132 or new_status == 1133:
-            self.status = 4
-        elif new_status == 1134 or new_status == 1137:
-            self.status = 4
+        info = Cid.get(int(status.get("Cid")))
+        if info is not None and info.status is not None and info.status != self.status:
+            self.status = info.status
+            self._journal(KIND_STATUS, {"status": self.status, "cid": status.get("Cid")})
+        self.publish()
 
         if self.callback is not None:
             self.callback(self.status)
 
+    def bypass_zones(self, indexes, bypass=True):
+        """Bypass or restore several zones over one session.
+
+        The SetByWay requests are pipelined on the warm command session and
+        verified with a single GetByWay. Returns the zone indexes that did
+        and did not end up in the requested state.
+        """
+
+        def command(client):
+            client.pipelined(*[("SetByWay", (index, bypass)) for index in indexes])
+            return client.GetByWay()
+
+        with self._journaled("bypass_zones", zones=list(indexes), bypass=bypass) as data:
+            states = self.standby.run(command)
+            self._mark_success()
+            self.sensors.update(states)
+            self._poll_cache.clear()
+            self.publish()
+
+            done, failed = [], []
+            for index in indexes:
+                ok = (
+                    index < len(self.sensors.states)
+                    and bool(self.sensors.flags(index) & ZONE_BYPASS) == bool(bypass)
+                )
+                (done if ok else failed).append(index)
+            data["failed"] = failed
+        return done, failed
+
+    def arm_bypass(self, status):
+        """Arm away or stay, bypassing the open zones first.
+
+        Open zones are taken from the cached GetByWay vector; their SetByWay
+        requests and the SetAlarmStatus are pipelined on the warm command
+        session, so arming costs about one relay round trip. Returns the
+        bypassed zone indexes and whether the panel accepted the arming.
+        """
+        command, pending = {
+            self.ARMED_AWAY: (0, self.ALARM_ARMING),
+            self.ARMED_STAY: (2, self.ARMED_STAY),
+        }[status]
+        indexes = self.sensors.bypass_candidates()
+
+        def ok(reply):
+            return not (isinstance(reply, dict) and reply.get("Err"))
+
+        def run(client):
+            return client.pipelined(
+                *[("SetByWay", (index, True)) for index in indexes],
+                ("SetAlarmStatus", (command,)),
+            )
+
+        try:
+            with self._journaled("arm_bypass", status=status, zones=indexes) as data:
+                replies = self.standby.run(run)
+                data["armed"] = ok(replies[-1])
+        except:
+            self.breaker.record_failure()
+            self.logger.debug("iAlarm-MK Unable to arm with bypass", exc_info=True)
+            raise
+        self._mark_success()
+
+        bypassed = [index for index, reply in zip(indexes, replies) if ok(reply)]
+        for index in bypassed:
+            self.sensors.set_bypass(index)
+        self._poll_cache.clear()
+        self.publish()
+        armed = ok(replies[-1])
+        if armed:
+            self._set_status(pending)
+        return bypassed, armed
+
     def cancel_alarm(self) -> None:
         try:
-            self.ialarmmkClient.login()
-            self.ialarmmkClient.SetAlarmStatus(3)
+            with self._journaled("cancel_alarm"):
+                self.standby.run(lambda client: client.SetAlarmStatus(3))
             self._set_status(self.DISARMED)
-            self.ialarmmkClient.logout()
+            self._mark_success()
         except:
-            pass
+            self.breaker.record_failure()
 
     def arm_stay(self) -> None:
         try:
-            self.ialarmmkClient.login()
-            self.ialarmmkClient.SetAlarmStatus(2)
+            with self._journaled("arm_stay"):
+                self.standby.run(lambda client: client.SetAlarmStatus(2))
             self._set_status(self.ARMED_STAY)
-            self.ialarmmkClient.logout()
+            self._mark_success()
         except:
+            self.breaker.record_failure()
             self.logger.debug("iAlarm-MK Unable to arm home", exc_info=True)
 
 
     def disarm(self) -> None:
         try:
-            self.ialarmmkClient.login()
-            self.ialarmmkClient.SetAlarmStatus(1)
+            with self._journaled("disarm"):
+                self.standby.run(lambda client: client.SetAlarmStatus(1))
             self._set_status(self.DISARMED)
-            self.ialarmmkClient.logout()
+            self._mark_success()
         except:
+            self.breaker.record_failure()
             self.logger.debug("iAlarm-MK Unable to disarm", exc_info=True)
 
 
     def arm_away(self) -> None:
         try:
-            self.ialarmmkClient.login()
-            self.ialarmmkClient.SetAlarmStatus(0)
+            with self._journaled("arm_away"):
+                self.standby.run(lambda client: client.SetAlarmStatus(0))
             self._set_status(self.ALARM_ARMING)
-            self.ialarmmkClient.logout()
+            self._mark_success()
         except:
+            self.breaker.record_failure()
             self.logger.debug("iAlarm-MK Unable to arm away", exc_info=True)
 
 
@@ -314,13 +831,18 @@ class iAlarmMkInterface:
             ).result()
 
     async def async_set_status(self, status):
-        self.callback(status)
-        pass
+        if status != self.status:
+            self._journal(KIND_STATUS, {"status": status})
+        self.status = status
+        self.publish()
+        if self.callback is not None:
+            self.callback(status)
 
     def get_mac(self) -> str:
-        self.ialarmmkClient.login()
-        network_info = self.ialarmmkClient.GetNet()
-        self.ialarmmkClient.logout()
+        with self._priority(PRIORITY_BULK):
+            self.ialarmmkClient.login()
+            network_info = self.ialarmmkClient.GetNet()
+            self.ialarmmkClient.logout()
         if network_info is not None:
             mac = network_info.get("Mac", "")
 
@@ -0,0 +1,272 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Append-only journal of alarm frames and commands.
+
+    python -m libpyialarmmk.journal bench [--rate 1000] [--seconds 5]
+    python -m libpyialarmmk.journal query ialarm-mk.jsonl [--start TS] [--end TS]
+"""
+
+import argparse
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+
+KIND_ALARM = "alarm"
+KIND_COMMAND = "command"
+KIND_STATUS = "status"
+
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+class EventJournal:
+    """
+    Size bounded, rotating JSON lines journal written by a background thread.
+
+    record() only appends to an in-memory queue, so it is safe to call from
+    the event loop at any rate; the writer thread encodes and writes what
+    accumulated, one batch per wake up, at most twice `flush_interval`
+    seconds after a record was queued, even if its wake up was missed. Each batch adds a (timestamp, offset)
+    line to the `.idx` file kept next to the journal file, which query()
+    bisects to seek straight to a time range. Files are rotated like
+    FrameCapture, the index files with them.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_bytes=DEFAULT_MAX_BYTES,
+        backup_count=DEFAULT_BACKUP_COUNT,
+        flush_interval=DEFAULT_FLUSH_INTERVAL,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._pending = deque()
+        self._wake = threading.Condition()
+        self._closed = False
+        self._file = None
+        self._index = None
+        self._size = 0
+        self._thread = threading.Thread(
+            target=self._run, name="iAlarmMK-Journal", daemon=True
+        )
+        self._thread.start()
+
+    def record(self, kind, data, ts=None):
+        self._pending.append((time.time() if ts is None else ts, kind, data))
+        # Best effort: racing callers may both miss the length of 1, the
+        # writer then finds the records on its next timed wake up.
+        if len(self._pending) == 1:
+            with self._wake:
+                self._wake.notify()
+
+    def close(self):
+        """Write what is still queued and stop the writer thread."""
+        with self._wake:
+            self._closed = True
+            self._wake.notify()
+        self._thread.join()
+
+    def query(self, start=None, end=None, limit=None):
+        """Return the records between start and end timestamps, oldest first."""
+        return query(self.path, start, end, limit, self.backup_count)
+
+    def _run(self):
+        while True:
+            with self._wake:
+                if not self._pending and not self._closed:
+                    self._wake.wait(self.flush_interval)
+                closed = self._closed
+            if not closed:
+                # Let a burst accumulate into one write.
+                time.sleep(self.flush_interval)
+            self._write_batch()
+            if closed:
+                break
+        if self._file is not None:
+            self._file.close()
+            self._index.close()
+
+    def _write_batch(self):
+        batch = []
+        pending = self._pending
+        while pending:
+            batch.append(pending.popleft())
+        if not batch:
+            return
+        lines = [
+            json.dumps({"t": ts, "k": kind, **data}, separators=(",", ":"), default=str)
+            + "\n"
+            for ts, kind, data in batch
+        ]
+        chunk = "".join(lines).encode()
+        if self._file is None:
+            self._open()
+        if self._size > 0 and self._size + len(chunk) > self.max_bytes:
+            self._rotate()
+        self._index.write("%r %d\n" % (batch[0][0], self._size))
+        self._file.write(chunk)
+        self._file.flush()
+        self._index.flush()
+        self._size += len(chunk)
+        self.written += len(batch)
+
+    def _open(self):
+        self._file = open(self.path, "ab")
+        self._index = open(self.path + ".idx", "a")
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        self._file.close()
+        self._index.close()
+        for suffix in ("", ".idx"):
+            for i in range(self.backup_count - 1, 0, -1):
+                src = "%s.%d%s" % (self.path, i, suffix)
+                if os.path.exists(src):
+                    os.replace(src, "%s.%d%s" % (self.path, i + 1, suffix))
+            if self.backup_count > 0:
+                os.replace(self.path + suffix, "%s.1%s" % (self.path, suffix))
+            else:
+                os.remove(self.path + suffix)
+        self._open()
+
+
+def journal_files(path, backup_count=DEFAULT_BACKUP_COUNT):
+    """Return the existing files of a journal, oldest first."""
+    paths = ["%s.%d" % (path, i) for i in range(backup_count, 0, -1)]
+    return [p for p in paths + [path] if os.path.exists(p)]
+
+
+def query(path, start=None, end=None, limit=None, backup_count=DEFAULT_BACKUP_COUNT):
+    """Return the records of a journal between two timestamps, oldest first."""
+    records = []
+    for name in journal_files(path, backup_count):
+        for record in _read(name, start, end):
+            records.append(record)
+            if limit is not None and len(records) >= limit:
+                return records
+    return records
+
+
+def _load_index(path):
+    stamps, offsets = [], []
+    try:
+        with open(path + ".idx") as f:
+            for line in f:
+                ts, offset = line.split()
+                stamps.append(float(ts))
+                offsets.append(int(offset))
+    except (OSError, ValueError):
+        pass
+    return stamps, offsets
+
+
+def _read(path, start, end):
+    stamps, offsets = _load_index(path)
+    if stamps and end is not None and stamps[0] > end:
+        return
+    offset = 0
+    if stamps and start is not None:
+        # Last batch starting at or before start; records are time ordered.
+        i = bisect.bisect_right(stamps, start) - 1
+        offset = offsets[i] if i >= 0 else 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            ts = record.get("t", 0)
+            if start is not None and ts < start:
+                continue
+            if end is not None and ts > end:
+                return
+            yield record
+
+
+def benchmark(rate=1000, seconds=5.0, path=None):
+    """Feed `rate` records per second for `seconds`, return the journal lag."""
+    directory = None
+    if path is None:
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "journal.jsonl")
+    journal = EventJournal(path, max_bytes=DEFAULT_MAX_BYTES // 4)
+    alarm = {"Cid": 1131, "Zone": 12, "Name": "Hall PIR", "Content": "Burglary"}
+    total = int(rate * seconds)
+    record_time = 0.0
+    begin = time.monotonic()
+    for n in range(total):
+        delay = begin + n / rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        start = time.perf_counter()
+        journal.record(KIND_ALARM, alarm)
+        record_time += time.perf_counter() - start
+    fed = time.monotonic()
+    journal.close()
+    done = time.monotonic()
+
+    query_start = time.perf_counter()
+    middle = journal.query(time.time() - seconds / 2, limit=100)
+    query_time = time.perf_counter() - query_start
+
+    stats = {
+        "records": journal.written,
+        "offered_per_second": round(total / (fed - begin)),
+        "record_us": round(record_time / total * 1e6, 2),
+        "drain_after_feed_s": round(done - fed, 3),
+        "range_query_ms": round(query_time * 1000, 2),
+        "range_query_hits": len(middle),
+        "files": len(journal_files(path)),
+    }
+    if directory is not None:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("bench")
+    bench.add_argument("--rate", type=int, default=1000)
+    bench.add_argument("--seconds", type=float, default=5.0)
+    query = sub.add_parser("query")
+    query.add_argument("journal")
+    query.add_argument("--start", type=float)
+    query.add_argument("--end", type=float)
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        for key, value in benchmark(args.rate, args.seconds).items():
+            print("%s: %s" % (key, value))
+        return
+    for record in query(args.journal, args.start, args.end):
+        print(json.dumps(record))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import heapq
+import itertools
+import threading
+import time
+
+# Priority classes, lower value is served first.
+PRIORITY_COMMAND = 0
+PRIORITY_PUSH = 1
+PRIORITY_POLL = 2
+PRIORITY_BULK = 3
+
+PRIORITY_NAMES = ("command", "push", "poll", "bulk")
+
+DEFAULT_RATE = 4.0  # requests per second towards the relay
+DEFAULT_BURST = 8
+
+
+class RelayRateLimiter:
+    """
+    Token bucket shared by every connection of one relay account.
+
+    Waiting requests are served by priority class first and in arrival order
+    within a class, so an arm/disarm never queues behind polls or bulk reads.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._counter = itertools.count()
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+        self.granted = [0] * len(PRIORITY_NAMES)
+        self.waited = [0.0] * len(PRIORITY_NAMES)
+
+    def configure(self, rate=None, burst=None):
+        with self._cond:
+            self._refill()
+            if rate is not None:
+                self.rate = float(rate)
+            if burst is not None:
+                self.burst = max(1, int(burst))
+            self._tokens = min(self._tokens, float(self.burst))
+            self._cond.notify_all()
+
+    def acquire(self, priority=PRIORITY_POLL, timeout=None):
+        """Block until a request of the given class may be sent."""
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        entry = (priority, next(self._counter))
+
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    self._refill()
+                    wait = None
+                    if self._waiters[0] == entry:
+                        if self._tokens >= 1.0:
+                            self._tokens -= 1.0
+                            self.granted[priority] += 1
+                            self.waited[priority] += time.monotonic() - start
+                            return True
+                        wait = (1.0 - self._tokens) / self.rate
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                if self._waiters[0] == entry:
+                    heapq.heappop(self._waiters)
+                else:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                name: {
+                    "granted": self.granted[i],
+                    "avg_wait": self.waited[i] / self.granted[i]
+                    if self.granted[i]
+                    else 0.0,
+                }
+                for i, name in enumerate(PRIORITY_NAMES)
+            }
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._stamp) * self.rate
+        )
+        self._stamp = now
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(uid, rate=None, burst=None):
+    """Return the limiter of a relay account, creating it on first use."""
+    with _limiters_lock:
+        limiter = _limiters.get(uid)
+        if limiter is None:
+            limiter = _limiters[uid] = RelayRateLimiter(
+                rate or DEFAULT_RATE, burst or DEFAULT_BURST
+            )
+        elif rate is not None or burst is not None:
+            limiter.configure(rate, burst)
+        return limiter
@@ -0,0 +1,108 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+
+SOURCE_LOG = "log"
+SOURCE_EVENTS = "events"
+
+_READERS = {SOURCE_LOG: "GetLogPage", SOURCE_EVENTS: "GetEventsPage"}
+
+
+def fingerprint(entry):
+    return hashlib.blake2s(repr(entry).encode(), digest_size=8).hexdigest()
+
+
+class LogSync:
+    """
+    Incremental reader of the panel GetLog/GetEvents history.
+
+    The cursor holds the offset just past the last seen entry and that
+    entry's fingerprint. A sync re-reads the page starting at the last seen
+    entry; if it still matches, only the pages after it are fetched. If it
+    does not (the log wrapped or was cleared) the newest pages are searched
+    backwards for the fingerprint, at most `max_pages` of them, so the cost
+    of a sync never depends on the length of the history.
+    """
+
+    def __init__(self, source=SOURCE_LOG, cursor=None, max_pages=4, page_size=16):
+        self.source = source
+        self.cursor = dict(cursor or {})
+        self.max_pages = max_pages
+        self.page_size = page_size
+
+    def sync(self, client):
+        """Return the entries added since the last sync, oldest first."""
+        read = getattr(client, _READERS[self.source])
+        offset = self.cursor.get("offset", 0)
+        anchor = self.cursor.get("fingerprint")
+
+        if anchor is None or offset == 0:
+            # First sync: anchor at the newest entry instead of replaying
+            # the whole history.
+            total, _ = read(0)
+            if total > 0:
+                _, page = read(total - 1)
+                if page:
+                    self._advance(total, page[-1])
+            return []
+
+        total, page = read(offset - 1)
+        self._learn(offset - 1, page, total)
+        if page and fingerprint(page[0]) == anchor:
+            new = page[1:]
+            pos = offset - 1 + len(page)
+            pages = 1
+            while pos < total and pages < self.max_pages:
+                total, page = read(pos)
+                if not page:
+                    break
+                new.extend(page)
+                pos += len(page)
+                pages += 1
+        else:
+            new, pos = self._resync(read, total, anchor)
+
+        if new:
+            self._advance(pos, new[-1])
+        else:
+            self.cursor["offset"] = pos
+        return new
+
+    def _resync(self, read, total, anchor):
+        end = total
+        collected = []
+        for _ in range(self.max_pages):
+            start = max(end - self.page_size, 0)
+            _, page = read(start)
+            if 0 < len(page) < end - start:
+                # Pages are shorter than assumed, retry with the real size.
+                self.page_size = len(page)
+                continue
+            page = page[: end - start]
+            for i in range(len(page) - 1, -1, -1):
+                if fingerprint(page[i]) == anchor:
+                    return page[i + 1 :] + collected, total
+            collected = page + collected
+            if start == 0 or not page:
+                break
+            end = start
+        return collected, total
+
+    def _learn(self, start, page, total):
+        if page and start + len(page) < total:
+            self.page_size = len(page)
+
+    def _advance(self, offset, entry):
+        self.cursor = {"offset": offset, "fingerprint": fingerprint(entry)}
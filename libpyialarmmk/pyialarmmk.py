@@ -15,9 +15,10 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 
-from __future__ import division, print_function, absolute_import
-from collections import OrderedDict as OD
+from __future__ import division, print_function, absolute_import, annotations
+from collections import OrderedDict as OD, namedtuple
 
+import hashlib
 import re
 import socket
 import time
@@ -25,8 +26,12 @@ import threading
 import uuid
 import asyncio
 
-from lxml import etree
-import xmltodict
+# lxml and xmltodict are imported on first use, keeping them out of the
+# Home Assistant bootstrap until an entry actually talks to the relay.
+
+from .framer import Framer, xor
+from .capture import CHANNEL_COMMAND, CHANNEL_PUSH, DIRECTION_IN, DIRECTION_OUT
+from .limiter import PRIORITY_POLL
 
 
 class ConnectionError(Exception):
@@ -49,18 +54,40 @@ class ResponseError(Exception):
     pass
 
 
+# Kind of a queued single page read, see _page().
+_PAGE = "page"
+
+
 class iAlarmMkClient:
 
     seq = 0
     timeout = 10
-
-    def __init__(self, host, port, uid, pwd):
+    capture = None
+    _queue = None
+    # Received bytes and parse time of the session, for poll reporting.
+    rx_bytes = 0
+    rx_frames = 0
+    parse_time = 0.0
+    # Shared {(xpath, offset): (payload digest, parsed reply)} of Get* replies,
+    # lets a client skip parsing a reply identical to the previous one.
+    cache = None
+    cache_hits = 0
+    # Per call of the last pipelined(): True when all its reply frames hit.
+    unchanged = ()
+
+    def __init__(
+        self, host, port, uid, pwd, limiter=None, priority=PRIORITY_POLL, capture=None
+    ):
         self.sock = None
+        self.capture = capture
+        self._framer = Framer()
 
         self.host = host
         self.port = port
         self.uid = uid
         self.pwd = pwd
+        self.limiter = limiter
+        self.priority = priority
 
     def __del__(self):
         self.logout()
@@ -137,6 +164,15 @@ class iAlarmMkClient:
         xpath = "/Root/Host/GetByWay"
         return self._(xpath, cmd, True)
 
+    def GetByWayPage(self, offset=0):
+        cmd = OD()
+        cmd["Total"] = None
+        cmd["Offset"] = S32(0)
+        cmd["Ln"] = None
+        cmd["Err"] = None
+        xpath = "/Root/Host/GetByWay"
+        return self._page(xpath, cmd, offset)
+
     def GetDefense(self):
         cmd = OD()
         cmd["Total"] = None
@@ -167,6 +203,15 @@ class iAlarmMkClient:
         xpath = "/Root/Host/GetEvents"
         return self._(xpath, cmd, True)
 
+    def GetEventsPage(self, offset=0):
+        cmd = OD()
+        cmd["Total"] = None
+        cmd["Offset"] = S32(0)
+        cmd["Ln"] = None
+        cmd["Err"] = None
+        xpath = "/Root/Host/GetEvents"
+        return self._page(xpath, cmd, offset)
+
     def GetGprs(self):
         cmd = OD()
         cmd["Apn"] = None
@@ -185,6 +230,15 @@ class iAlarmMkClient:
         xpath = "/Root/Host/GetLog"
         return self._(xpath, cmd, True)
 
+    def GetLogPage(self, offset=0):
+        cmd = OD()
+        cmd["Total"] = None
+        cmd["Offset"] = S32(0)
+        cmd["Ln"] = None
+        cmd["Err"] = None
+        xpath = "/Root/Host/GetLog"
+        return self._page(xpath, cmd, offset)
+
     def GetNet(self):
         cmd = OD()
         cmd["Mac"] = None
@@ -667,12 +721,59 @@ class iAlarmMkClient:
         xpath = "/Root/Host/SetZone"
         return self._(xpath, cmd)
 
+    def pipelined(self, *calls):
+        """
+        Run several commands with all requests sent before any reply is read.
+
+        Each call is a (method name, args) tuple, e.g. ("SetByWay", (3, True));
+        results are returned in order. List replies spanning several pages
+        are completed after the pipelined replies have been read. With a
+        cache, `unchanged` tells which calls got only cached replies.
+        """
+        queued = self._queue = []
+        try:
+            for name, args in calls:
+                getattr(self, name)(*args)
+        finally:
+            self._queue = None
+
+        for xpath, cmd, is_list in queued:
+            self._send(self._create(xpath, cmd))
+        replies, unchanged = [], []
+        for xpath, cmd, _ in queued:
+            hits = self.cache_hits
+            replies.append(self._receive(xpath, cmd))
+            unchanged.append(self.cache_hits > hits)
+
+        results = []
+        for index, ((xpath, cmd, is_list), resp) in enumerate(zip(queued, replies)):
+            if is_list is _PAGE:
+                results.append(self._page_reply(resp, xpath))
+                continue
+            if not is_list:
+                results.append(self._select(resp, xpath))
+                continue
+            total = self._select(resp, "%s/Total" % xpath) or 0
+            ln = self._select(resp, "%s/Ln" % xpath) or 0
+            l = [self._select(resp, "%s/L%d" % (xpath, i)) for i in range(ln)]
+            if total > ln:
+                hits, frames = self.cache_hits, self.rx_frames
+                self._(xpath, cmd, True, ln, l)
+                if self.cache_hits - hits != self.rx_frames - frames:
+                    unchanged[index] = False
+            results.append(l)
+        self.unchanged = unchanged
+        return results
+
     def _(self, xpath, cmd, is_list=False, offset=0, l=None):
+        if self._queue is not None:
+            self._queue.append((xpath, cmd, is_list))
+            return None
         if offset > 0:
             cmd["Offset"] = S32(offset)
         root = self._create(xpath, cmd)
         self._send(root)
-        resp = self._receive()
+        resp = self._receive(xpath, cmd)
         if is_list == False:
             return self._select(resp, xpath)
         if l is None:
@@ -687,39 +788,83 @@ class iAlarmMkClient:
             self._(xpath, cmd, is_list, offset, l)
         return l
 
+    def _page(self, xpath, cmd, offset=0):
+        """Fetch a single page of a list reply, return (total, entries)."""
+        cmd["Offset"] = S32(offset)
+        if self._queue is not None:
+            self._queue.append((xpath, cmd, _PAGE))
+            return None
+        root = self._create(xpath, cmd)
+        self._send(root)
+        return self._page_reply(self._receive(xpath, cmd), xpath)
+
+    def _page_reply(self, resp, xpath):
+        total = self._select(resp, "%s/Total" % xpath) or 0
+        ln = self._select(resp, "%s/Ln" % xpath) or 0
+        return total, [self._select(resp, "%s/L%d" % (xpath, i)) for i in range(ln)]
+
     def _send(self, root):
+        if self.limiter is not None:
+            self.limiter.acquire(self.priority)
+        from lxml import etree
+
         xml: str = etree.tostring(self._convert_dict_to_xml(root), pretty_print=False)
         self.seq += 1
-        mesg = b"@ieM%04d%04d0000%s%04d" % (
-            len(xml),
-            self.seq,
-            self._xor(xml),
-            self.seq,
-        )
-        self.sock.send(mesg)
+        mesg = self._framer.pack(xml, self.seq)
+        if self.capture is not None:
+            self.capture.record(CHANNEL_COMMAND, DIRECTION_OUT, mesg)
+        self.sock.sendall(mesg)
 
-    def _receive(self):
+    def _receive(self, xpath=None, cmd=None):
         try:
-            data = self.sock.recv(1024)
+            data = self._framer.recv(self.sock)
         except socket.timeout:
             self.sock.close()
             raise ConnectionError("Connection error")
+        if self.capture is not None:
+            self.capture.record(CHANNEL_COMMAND, DIRECTION_IN, data)
+        self.rx_bytes += len(data)
+        self.rx_frames += 1
+
+        key = digest = None
+        if self.cache is not None and xpath and xpath.startswith("/Root/Host/Get"):
+            key = (xpath, cmd.get("Offset"))
+            digest = hashlib.blake2b(data[16:-4], digest_size=16).digest()
+            hit = self.cache.get(key)
+            if hit is not None and hit[0] == digest:
+                self.cache_hits += 1
+                return hit[1]
+
+        start = time.perf_counter()
+        resp = self._parse(self._framer.decode(data))
+        self.parse_time += time.perf_counter() - start
+        if key is not None:
+            self.cache[key] = (digest, resp)
+        return resp
+
+    def _parse(self, payload):
+        import xmltodict
+
         return xmltodict.parse(
-            self._xor(data[16:-4]).decode(),
+            payload,
             xml_attribs=False,
             dict_constructor=dict,
             postprocessor=self._xmlread,
         )
 
+    def _decode(self, data):
+        """Decode one raw frame of either channel, None for keepalives."""
+        head = data[0:4]
+        if head == b"%maI":
+            return None
+        if head in (b"@ieM", b"@alA"):
+            return self._parse(self._xor(data[16:-4]).decode())
+        if head == b"!lmX":
+            return self._parse(data[16:-4])
+        raise ResponseError("Unknown frame header %s" % head)
+
     def _xor(self, input):
-        sz = bytearray.fromhex(
-            "0c384e4e62382d620e384e4e44382d300f382b382b0c5a6234384e304e4c372b10535a0c20432d171142444e58422c421157322a204036172056446262382b5f0c384e4e62382d620e385858082e232c0f382b382b0c5a62343830304e2e362b10545a0c3e432e1711384e625824371c1157324220402c17204c444e624c2e12"
-        )
-        buf = bytearray(input)
-        for i in range(len(input)):
-            ki = i & 0x7F
-            buf[i] = buf[i] ^ sz[ki]
-        return buf
+        return xor(input)
 
     def _create(self, path, mydict={}):
         root = {}
@@ -805,6 +950,8 @@ class iAlarmMkClient:
 
     @staticmethod
     def _convert_dict_to_xml_recurse(parent: etree.Element, dictitem: dict) -> None:
+        from lxml import etree
+
         assert not isinstance(dictitem, type([]))
 
         if isinstance(dictitem, dict):
@@ -827,6 +974,8 @@ class iAlarmMkClient:
     @staticmethod
     def _convert_dict_to_xml(xmldict: dict):
         # Converts a dictionary to an XML ElementTree Element
+        from lxml import etree
+
         root_tag = list(xmldict.keys())[0]
         root: etree.Element = etree.Element(root_tag)
         iAlarmMkClient._convert_dict_to_xml_recurse(root, xmldict[root_tag])
@@ -839,7 +988,18 @@ class iAlarmMkPushClient(asyncio.Protocol, iAlarmMkClient):
     keepalive = 60
     timeout = 10
 
-    def __init__(self, host, port, uid, handler, loop, on_con_lost, logger=None):
+    def __init__(
+        self,
+        host,
+        port,
+        uid,
+        handler,
+        loop,
+        on_con_lost,
+        logger=None,
+        on_alive=None,
+        capture=None,
+    ):
         if not callable(handler):
             raise AttributeError("handler is not a function")
         self.host = host
@@ -855,6 +1015,9 @@ class iAlarmMkPushClient(asyncio.Protocol, iAlarmMkClient):
         self.on_con_lost = on_con_lost
         self.transport = None
         self.logger = logger
+        self.on_alive = on_alive
+        self.capture = capture
+        self._framer = Framer()
 
         # asyncore.dispatcher.__init__(self, map=self._thread_sockets)
 
@@ -868,6 +1031,9 @@ class iAlarmMkPushClient(asyncio.Protocol, iAlarmMkClient):
 
     def connection_lost(self, exc):
         self._close()
+        # The transport is already closing here, so _close() left it alone.
+        if not self.on_con_lost.done():
+            self.on_con_lost.set_result(True)
 
     def __del__(self):
         try:
@@ -898,19 +1064,19 @@ class iAlarmMkPushClient(asyncio.Protocol, iAlarmMkClient):
         try:
             if type(data) == str:
                 data = data.encode()
+            if self.capture is not None:
+                self.capture.record(CHANNEL_PUSH, DIRECTION_IN, data)
             head = data[0:4]
 
+            if self.on_alive is not None:
+                self.on_alive()
+
             if head == b"%maI":
                 threading.Timer(self.keepalive, self._keepalive).start()
 
             elif head == b"@ieM":
                 xpath = "/Root/Pair/Push"
-                resp = xmltodict.parse(
-                    self._xor(data[16:-4]).decode(),
-                    xml_attribs=False,
-                    dict_constructor=dict,
-                    postprocessor=self._xmlread,
-                )
+                resp = self._decode(data)
                 self.push = self._select(resp, xpath)
                 # protocol update
                 if self.push:
@@ -924,42 +1090,29 @@ class iAlarmMkPushClient(asyncio.Protocol, iAlarmMkClient):
                 else:
                     xpath = "/Root/Host/Alarm"
                     self.handler(self._select(resp, xpath))
-            elif head == b"@alA":
-                xpath = "/Root/Host/Alarm"
-                resp = xmltodict.parse(
-                    self._xor(data[16:-4]).decode(),
-                    xml_attribs=False,
-                    dict_constructor=dict,
-                    postprocessor=self._xmlread,
-                )
-                self.handler(self._select(resp, xpath))
-
-            elif head == b"!lmX":
+            elif head == b"@alA" or head == b"!lmX":
                 xpath = "/Root/Host/Alarm"
-                resp = xmltodict.parse(
-                    data[16:-4],
-                    xml_attribs=False,
-                    dict_constructor=dict,
-                    postprocessor=self._xmlread,
-                )
-                self.handler(self._select(resp, xpath))
+                self.handler(self._select(self._decode(data), xpath))
 
             else:
                 self._close()
-                print("Unknown data received: %s" % head)
-                print(data)
                 raise ResponseError("Response error")
         except:
-            print("Unknown data received: %s" % head)
-            print(data)
+            self._print("Unknown data received: %s" % data)
 
 
     def handle_write(self):
         if self.mesg is not None:
+            from lxml import etree
+
             xml: str = etree.tostring(
                 self._convert_dict_to_xml(self.mesg), pretty_print=False
             )
-            mesg = b"@ieM%04d%04d0000%s%04d" % (len(xml), 0, self._xor(xml), 0)
+            # Selector transports may queue the object itself, and the
+            # framer reuses its buffer.
+            mesg = bytes(self._framer.pack(xml, 0))
+            if self.capture is not None:
+                self.capture.record(CHANNEL_PUSH, DIRECTION_OUT, mesg)
             self.transport.write(mesg)
             self.mesg = None
 
@@ -979,6 +1132,8 @@ class iAlarmMkPushClient(asyncio.Protocol, iAlarmMkClient):
 
     def _keepalive(self):
         mesg = b"%maI"
+        if self.capture is not None:
+            self.capture.record(CHANNEL_PUSH, DIRECTION_OUT, mesg)
         self.transport.write(mesg)
         self.mesg = None
 
@@ -1029,40 +1184,49 @@ def TYP(val, typ=[]):
         return "TYP,NONE,|%d" % val
 
 
+SEVERITY_INFO = "info"
+SEVERITY_RESTORE = "restore"
+SEVERITY_TROUBLE = "trouble"
+SEVERITY_ALARM = "alarm"
+
+# status is the DevStatus the panel moves to (0 armed, 1 disarmed, 2 stay,
+# 4 triggered) or None when the event does not change the arming state.
+CidInfo = namedtuple("CidInfo", ["status", "severity", "description"])
+
 Cid = {
-    "1100": "Personal ambulance",
-    "1101": "Emergency",
-    "1110": "Fire",
-    "1120": "Emergency",
-    "1131": "Perimeter",
-    "1132": "Burglary",
-    "1133": "24 hour",
-    "1134": "Delay",
-    "1137": "Dismantled",
-    "1301": "System AC fault",
-    "1302": "System battery failure",
-    "1306": "Programming changes",
-    "1350": "Communication failure",
-    "1351": "Telephone line fault",
-    "1370": "Circuit fault",
-    "1381": "Detector lost",
-    "1384": "Low battery detector",
-    "1401": "Disarm report",
-    "1406": "Alarm canceled",
-    "1455": "Automatic arming failed",
-    "1570": "Bypass Report",
-    "1601": "Manual communication test reports",
-    "1602": "Communications test reports",
-    "3301": "System AC recovery",
-    "3302": "System battery recovery",
-    "3350": "Communication resumes",
-    "3351": "Telephone line to restore",
-    "3370": "Loop recovery",
-    "3381": "Detector loss recovery",
-    "3384": "Detector low voltage recovery",
-    "3401": "Arming Report",
-    "3441": "Staying Report",
-    "3570": "Bypass recovery",
+    1100: CidInfo(4, SEVERITY_ALARM, "Personal ambulance"),
+    1101: CidInfo(4, SEVERITY_ALARM, "Emergency"),
+    1110: CidInfo(None, SEVERITY_ALARM, "Fire"),
+    1120: CidInfo(4, SEVERITY_ALARM, "Emergency"),
+    1131: CidInfo(4, SEVERITY_ALARM, "Perimeter"),
+    1132: CidInfo(4, SEVERITY_ALARM, "Burglary"),
+    1133: CidInfo(4, SEVERITY_ALARM, "24 hour"),
+    1134: CidInfo(4, SEVERITY_ALARM, "Delay"),
+    1137: CidInfo(4, SEVERITY_ALARM, "Dismantled"),
+    1301: CidInfo(None, SEVERITY_TROUBLE, "System AC fault"),
+    1302: CidInfo(None, SEVERITY_TROUBLE, "System battery failure"),
+    1306: CidInfo(None, SEVERITY_INFO, "Programming changes"),
+    1350: CidInfo(None, SEVERITY_TROUBLE, "Communication failure"),
+    1351: CidInfo(None, SEVERITY_TROUBLE, "Telephone line fault"),
+    1370: CidInfo(None, SEVERITY_TROUBLE, "Circuit fault"),
+    1381: CidInfo(None, SEVERITY_TROUBLE, "Detector lost"),
+    1384: CidInfo(None, SEVERITY_TROUBLE, "Low battery detector"),
+    1401: CidInfo(1, SEVERITY_INFO, "Disarm report"),
+    1406: CidInfo(1, SEVERITY_INFO, "Alarm canceled"),
+    1455: CidInfo(None, SEVERITY_TROUBLE, "Automatic arming failed"),
+    1570: CidInfo(None, SEVERITY_INFO, "Bypass Report"),
+    1601: CidInfo(None, SEVERITY_INFO, "Manual communication test reports"),
+    1602: CidInfo(None, SEVERITY_INFO, "Communications test reports"),
+    3301: CidInfo(None, SEVERITY_RESTORE, "System AC recovery"),
+    3302: CidInfo(None, SEVERITY_RESTORE, "System battery recovery"),
+    3350: CidInfo(None, SEVERITY_RESTORE, "Communication resumes"),
+    3351: CidInfo(None, SEVERITY_RESTORE, "Telephone line to restore"),
+    3370: CidInfo(None, SEVERITY_RESTORE, "Loop recovery"),
+    3381: CidInfo(None, SEVERITY_RESTORE, "Detector loss recovery"),
+    3384: CidInfo(None, SEVERITY_RESTORE, "Detector low voltage recovery"),
+    3401: CidInfo(0, SEVERITY_INFO, "Arming Report"),
+    3441: CidInfo(2, SEVERITY_INFO, "Staying Report"),
+    3570: CidInfo(None, SEVERITY_INFO, "Bypass recovery"),
 }
 
 TZ = {
@@ -0,0 +1,83 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Replay a frame capture through the decoder.
+
+    python -m libpyialarmmk.replay ialarm-mk.cap [--realtime] [--events]
+"""
+
+import argparse
+import time
+
+from .capture import CHANNEL_PUSH, DIRECTION_IN, read_capture
+from .pyialarmmk import iAlarmMkClient
+
+
+def replay(path, handler=None, realtime=False):
+    """
+    Decode every inbound frame of a capture and return throughput stats.
+
+    Push alarm frames are passed to `handler` exactly as iAlarmMkPushClient
+    does, so `iAlarmMkInterface.set_status` can be used to drive the
+    coordinator. With `realtime` the original inter-frame gaps are kept.
+    """
+    decoder = iAlarmMkClient(None, None, None, None)
+    stats = {"frames": 0, "bytes": 0, "events": 0, "errors": 0, "decode_time": 0.0}
+    previous = None
+
+    for ts, channel, direction, data in read_capture(path):
+        if direction != DIRECTION_IN:
+            continue
+        if realtime and previous is not None and ts > previous:
+            time.sleep(ts - previous)
+        previous = ts
+
+        start = time.perf_counter()
+        try:
+            resp = decoder._decode(data)
+        except Exception:
+            stats["errors"] += 1
+            continue
+        finally:
+            stats["decode_time"] += time.perf_counter() - start
+        stats["frames"] += 1
+        stats["bytes"] += len(data)
+
+        if channel == CHANNEL_PUSH and resp is not None:
+            alarm = decoder._select(resp, "/Root/Host/Alarm")
+            if alarm:
+                stats["events"] += 1
+                if handler is not None:
+                    handler(alarm)
+
+    if stats["decode_time"] > 0:
+        stats["frames_per_second"] = stats["frames"] / stats["decode_time"]
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("capture")
+    parser.add_argument("--realtime", action="store_true")
+    parser.add_argument("--events", action="store_true", help="print alarm events")
+    args = parser.parse_args(argv)
+
+    stats = replay(args.capture, print if args.events else None, args.realtime)
+    for key, value in stats.items():
+        print("%s: %s" % (key, value))
+
+
+if __name__ == "__main__":
+    main()
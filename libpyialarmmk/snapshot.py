@@ -0,0 +1,104 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import gzip
+import json
+import os
+import time
+
+SNAPSHOT_FORMAT = "ialarm-mk-config"
+SNAPSHOT_VERSION = 1
+
+# Argument-less configuration readers, in snapshot order.
+CONFIG_READERS = (
+    "GetSys",
+    "GetNet",
+    "GetServ",
+    "GetPairServ",
+    "GetTel",
+    "GetTime",
+    "GetEmail",
+    "GetGprs",
+    "GetPhone",
+    "GetZone",
+    "GetZoneType",
+    "GetOverlapZone",
+    "GetDefense",
+    "GetSensor",
+    "GetRemote",
+    "GetRfid",
+    "GetRfidType",
+    "GetSwitch",
+    "GetSwitchInfo",
+    "GetVoiceType",
+    "GetWlsList",
+)
+
+DEFAULT_DEPTH = 8
+
+
+def write_snapshot(client, path, meta=None, readers=CONFIG_READERS, depth=DEFAULT_DEPTH):
+    """
+    Read the panel configuration over the logged in client into path.
+
+    Readers are pipelined `depth` at a time and each batch is streamed to
+    the file as soon as it is parsed. The file is gzipped JSON lines: a
+    header with the format version and `meta`, then one line per reader.
+    It is written next to path and renamed over it once complete.
+    """
+    start = time.monotonic()
+    tmp = path + ".tmp"
+    header = dict(meta or {})
+    header.update(format=SNAPSHOT_FORMAT, version=SNAPSHOT_VERSION, taken=time.time())
+    try:
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            _write_line(f, header)
+            for i in range(0, len(readers), depth):
+                batch = readers[i : i + depth]
+                results = client.pipelined(*[(name, ()) for name in batch])
+                for name, data in zip(batch, results):
+                    _write_line(f, {"reader": name, "data": data})
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return {
+        "path": path,
+        "bytes": os.path.getsize(path),
+        "readers": len(readers),
+        "seconds": round(time.monotonic() - start, 3),
+    }
+
+
+def read_snapshot(path):
+    """Return (header, {reader: data}) of a snapshot file."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError("%s is not a configuration snapshot" % path)
+        if header.get("version", 0) > SNAPSHOT_VERSION:
+            raise ValueError("Unsupported snapshot version %s" % header["version"])
+        config = {}
+        for line in f:
+            record = json.loads(line)
+            config[record["reader"]] = record["data"]
+    return header, config
+
+
+def _write_line(f, record):
+    f.write(json.dumps(record, separators=(",", ":"), default=str))
+    f.write("\n")
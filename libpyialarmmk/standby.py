@@ -0,0 +1,123 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+from collections import deque
+
+from .limiter import PRIORITY_POLL
+from .pyialarmmk import ConnectionError as RelayConnectionError
+
+DEFAULT_KEEPALIVE = 45.0  # seconds, below the relay idle timeout
+
+
+class WarmStandby:
+    """
+    One pre-connected, logged in command session kept ready.
+
+    keepalive() is meant to be called periodically: it opens the session if
+    needed and otherwise sends a cheap GetAlarmStatus once `interval`
+    seconds have passed since the last request. run() executes a command on
+    the session, reconnecting once if the warm session turns out dead (a
+    reply that did arrive, even an error, is never sent twice), and records the command to acknowledgement latency.
+    """
+
+    def __init__(self, factory, interval=DEFAULT_KEEPALIVE, samples=200, logger=None):
+        self.factory = factory
+        self.interval = interval
+        self.logger = logger
+        self.latencies = deque(maxlen=samples)
+        self.cold_starts = 0
+        self._client = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+        # Separate from _lock, which is held for whole commands.
+        self._latency_lock = threading.Lock()
+
+    def run(self, command):
+        """Run command(client) on the warm session and return its result."""
+        start = time.perf_counter()
+        with self._lock:
+            warm = self._client is not None
+            try:
+                result = command(self._session())
+            except (OSError, RelayConnectionError):
+                self._drop()
+                if not warm:
+                    raise
+                # The warm session died while idle, retry on a fresh one.
+                result = command(self._session())
+            except Exception:
+                self._drop()
+                raise
+            self._last_used = time.monotonic()
+        with self._latency_lock:
+            self.latencies.append(time.perf_counter() - start)
+        return result
+
+    def keepalive(self):
+        with self._lock:
+            if self._client is None:
+                self._session()
+                return None
+            if time.monotonic() - self._last_used < self.interval:
+                return None
+            previous = self._client.priority
+            self._client.priority = PRIORITY_POLL
+            try:
+                status = self._client.GetAlarmStatus()
+                self._last_used = time.monotonic()
+                return status
+            except Exception:
+                self._drop()
+                if self.logger is not None:
+                    self.logger.debug("iAlarm-MK Standby session lost", exc_info=True)
+                return None
+            finally:
+                if self._client is not None:
+                    self._client.priority = previous
+
+    def close(self):
+        with self._lock:
+            self._drop()
+
+    def stats(self):
+        """Return p50/p99 command latency in milliseconds."""
+        with self._latency_lock:
+            samples = list(self.latencies)
+        samples.sort()
+        if not samples:
+            return {"p50": None, "p99": None, "count": 0}
+
+        def pct(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000)
+
+        return {"p50": pct(0.50), "p99": pct(0.99), "count": len(samples)}
+
+    def _session(self):
+        if self._client is None:
+            self.cold_starts += 1
+            client = self.factory()
+            client.login()
+            self._client = client
+            self._last_used = time.monotonic()
+        return self._client
+
+    def _drop(self):
+        if self._client is not None:
+            try:
+                self._client.logout()
+            except Exception:
+                pass
+            self._client = None
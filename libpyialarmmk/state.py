@@ -0,0 +1,86 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+from dataclasses import dataclass, field
+
+from .zones import ALERT, FLAGS, LOW_BATTERY, OPEN
+
+
+@dataclass(frozen=True)
+class PanelSnapshot:
+    """
+    One consistent, immutable view of the panel state.
+
+    `version` grows by one with every published change, so two snapshots
+    with the same version hold the same state.
+    """
+
+    version: int = 0
+    status: int | None = None
+    zones: bytes = b""
+    # ((switch index, is_on), ...)
+    switches: tuple = ()
+    published: float = field(default_factory=time.time, compare=False)
+
+    def flags(self, index):
+        return FLAGS[self.zones[index]] if index < len(self.zones) else 0
+
+    def is_open(self, index):
+        return index < len(self.zones) and OPEN[self.zones[index]] == 1
+
+    def is_low_battery(self, index):
+        return index < len(self.zones) and LOW_BATTERY[self.zones[index]] == 1
+
+    def is_alert(self, index):
+        return index < len(self.zones) and ALERT[self.zones[index]] == 1
+
+    def switch(self, index):
+        for num, is_on in self.switches:
+            if num == index:
+                return is_on
+        return None
+
+
+class SnapshotPublisher:
+    """
+    Builds snapshots from the live state and swaps them in atomically.
+
+    publish() may be called from the event loop and executor threads alike;
+    a new snapshot, with the next version, is only made when the state
+    differs from the current one. on_change(old, new) is called for each
+    new snapshot, in version order.
+    """
+
+    def __init__(self, on_change=None):
+        self.current = PanelSnapshot()
+        self.on_change = on_change
+        self._lock = threading.Lock()
+
+    def publish(self, status, zones, switches):
+        with self._lock:
+            current = self.current
+            zones = bytes(zones)
+            switches = tuple(sorted(switches))
+            if (current.status, current.zones, current.switches) == (
+                status,
+                zones,
+                switches,
+            ):
+                return current
+            self.current = PanelSnapshot(current.version + 1, status, zones, switches)
+            if self.on_change is not None:
+                self.on_change(current, self.current)
+            return self.current
@@ -0,0 +1,169 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+
+from .zones import LOW_BATTERY, OPEN
+
+BUCKETS = 60  # one per minute, for the rolling hour
+
+
+class ZoneActivity:
+    """
+    Activity counters of one zone.
+
+    Opens are counted in a ring of per-minute buckets with a running sum,
+    so recording an open and reading the opens of the last hour are O(1).
+    """
+
+    __slots__ = (
+        "last_opened",
+        "opens",
+        "battery_since",
+        "battery_seconds",
+        "_minute",
+        "_buckets",
+        "_hour",
+    )
+
+    def __init__(self):
+        self.last_opened = None
+        self.opens = 0
+        self.battery_since = None
+        self.battery_seconds = 0.0
+        self._minute = 0
+        self._buckets = [0] * BUCKETS
+        self._hour = 0
+
+    def opened(self, now):
+        self._advance(now)
+        self._buckets[self._minute % BUCKETS] += 1
+        self._hour += 1
+        self.opens += 1
+        self.last_opened = now
+
+    def battery(self, low, now):
+        if low and self.battery_since is None:
+            self.battery_since = now
+        elif not low and self.battery_since is not None:
+            self.battery_seconds += max(now - self.battery_since, 0)
+            self.battery_since = None
+
+    def opens_last_hour(self, now):
+        self._advance(now)
+        return self._hour
+
+    def battery_trouble_seconds(self, now):
+        ongoing = now - self.battery_since if self.battery_since is not None else 0
+        return round(self.battery_seconds + max(ongoing, 0))
+
+    def as_dict(self, now):
+        return {
+            "last_opened": self.last_opened,
+            "opens": self.opens,
+            "opens_last_hour": self.opens_last_hour(now),
+            "battery_trouble": self.battery_since is not None,
+            "battery_trouble_seconds": self.battery_trouble_seconds(now),
+        }
+
+    def dump(self):
+        return [
+            self.last_opened,
+            self.opens,
+            self.battery_since,
+            round(self.battery_seconds, 1),
+            self._minute,
+            self._buckets,
+        ]
+
+    @classmethod
+    def load(cls, data):
+        activity = cls()
+        (
+            activity.last_opened,
+            activity.opens,
+            activity.battery_since,
+            activity.battery_seconds,
+            activity._minute,
+            buckets,
+        ) = data
+        if len(buckets) == BUCKETS:
+            activity._buckets = list(buckets)
+            activity._hour = sum(buckets)
+        return activity
+
+    def _advance(self, now):
+        minute = int(now // 60)
+        if minute <= self._minute:
+            # Same minute, or the clock went back: keep the current bucket.
+            return
+        if minute - self._minute >= BUCKETS:
+            self._buckets = [0] * BUCKETS
+            self._hour = 0
+        else:
+            for m in range(self._minute + 1, minute + 1):
+                self._hour -= self._buckets[m % BUCKETS]
+                self._buckets[m % BUCKETS] = 0
+        self._minute = minute
+
+
+class ZoneStats:
+    """Per zone activity, fed with the zone changes between snapshots."""
+
+    def __init__(self):
+        self.zones = {}
+        self._lock = threading.Lock()
+
+    def feed(self, old, new, now=None):
+        """Record the opens and battery changes from snapshot old to new."""
+        if old.zones == new.zones:
+            return
+        now = time.time() if now is None else now
+        # The first snapshot only tells what is already open, not an open.
+        initial = old.version == 0
+        before = old.zones.ljust(len(new.zones), b"\0")
+        with self._lock:
+            for index, (a, b) in enumerate(zip(before, new.zones)):
+                if a == b:
+                    continue
+                activity = self.zones.get(index)
+                if activity is None:
+                    activity = self.zones[index] = ZoneActivity()
+                if OPEN[b] and not OPEN[a] and not initial:
+                    activity.opened(now)
+                if LOW_BATTERY[a] != LOW_BATTERY[b] or initial:
+                    activity.battery(LOW_BATTERY[b] == 1, now)
+
+    def get(self, index, now=None):
+        """Return the statistics of a zone index, None if never active."""
+        with self._lock:
+            activity = self.zones.get(index)
+            if activity is None:
+                return None
+            return activity.as_dict(time.time() if now is None else now)
+
+    def dump(self):
+        with self._lock:
+            return {str(index): a.dump() for index, a in self.zones.items()}
+
+    def load(self, data):
+        zones = {}
+        for index, item in (data or {}).items():
+            try:
+                zones[int(index)] = ZoneActivity.load(item)
+            except (TypeError, ValueError):
+                continue
+        with self._lock:
+            self.zones = zones
@@ -0,0 +1,62 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+class Switch:
+    """A paired panel output, driven with OpSwitch."""
+
+    __slots__ = ("index", "code", "name", "is_on", "reported")
+
+    def __init__(self, index, code, name=None):
+        self.index = index
+        self.code = code
+        self.name = name or "Switch %d" % (index + 1)
+        # None until the panel reports it or a command sets it.
+        self.is_on = None
+        self.reported = False
+
+
+def _code(entry):
+    return entry.get("Code") if isinstance(entry, dict) else entry
+
+
+def load_switches(switches, infos):
+    """Return {index: Switch} of the paired outputs of GetSwitch/GetSwitchInfo."""
+    result = {}
+    for index, entry in enumerate(switches or []):
+        if not _code(entry):
+            continue
+        info = infos[index] if infos and index < len(infos) else None
+        result[index] = Switch(
+            index, _code(entry), info.get("Name") if isinstance(info, dict) else None
+        )
+    update_switches(result, switches)
+    return result
+
+
+def update_switches(result, switches):
+    """
+    Refresh the on/off state from a GetSwitch reply, where it is reported.
+
+    Returns True if any state changed.
+    """
+    changed = False
+    for index, switch in result.items():
+        if index < len(switches or []) and isinstance(switches[index], dict):
+            state = switches[index].get("En")
+            if state is not None:
+                changed |= switch.is_on != bool(state)
+                switch.is_on = bool(state)
+                switch.reported = True
+    return changed
@@ -0,0 +1,168 @@
+# Copyright (C) 2022, ServiceA3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+ZONE_NOT_USED = 0
+ZONE_IN_USE = 1 << 0
+ZONE_ALARM = 1 << 1
+ZONE_BYPASS = 1 << 2
+ZONE_FAULT = 1 << 3
+ZONE_LOW_BATTERY = 1 << 4
+ZONE_LOSS = 1 << 5
+
+# GetZone "Type" values, in SetZone order.
+ZONE_TYPES = ("NO", "DE", "SI", "IN", "FO", "HO24", "FI", "KE", "GAS", "WT")
+# Delay, perimeter, interior and follower zones: the only ones armed and
+# disarmed with the panel, so the only ones auto-bypass may touch.
+BYPASSABLE_TYPES = frozenset((1, 2, 3, 4))
+
+
+def _table(values):
+    table = bytearray(256)
+    for value in values:
+        table[value] = 1
+    return bytes(table)
+
+
+# Per GetByWay value lookup tables, indexed by the raw state byte.
+FLAGS = bytes(value & 0x3F for value in range(256))
+OPEN = _table((9, 11, 17, 27))
+LOW_BATTERY = _table((17, 25))
+ALERT = _table((3, 11, 19, 27))
+
+
+def covering_pages(indexes, page_size):
+    """Return the list Offsets of the pages holding the given zone indexes."""
+    if not page_size:
+        return [0]
+    return sorted({index - index % page_size for index in indexes})
+
+
+class Zone:
+    """Static metadata of a configured zone."""
+
+    __slots__ = ("id", "index", "zone", "name", "type", "device_class")
+
+    def __init__(self, id, index, zone, device_class="door"):
+        self.id = id
+        self.index = index
+        self.zone = zone
+        self.name = zone.get("Name", id) if isinstance(zone, dict) else id
+        self.type = zone.get("Type") if isinstance(zone, dict) else None
+        self.device_class = device_class
+
+
+class ZoneStore:
+    """
+    Zone states kept in one bytearray indexed by zone index.
+
+    Metadata lives in `Zone` objects keyed by sensor id; the mapping
+    interface (items, keys, [], del, ...) works on those.
+    """
+
+    def __init__(self):
+        self.states = bytearray()
+        self._zones = {}
+
+    def add(self, id, index, zone, state=0):
+        if index >= len(self.states):
+            self.states.extend(bytes(index + 1 - len(self.states)))
+        self.states[index] = state & 0xFF
+        self._zones[id] = Zone(id, index, zone)
+        return self._zones[id]
+
+    def update(self, states):
+        """Load a whole GetByWay vector, return the indexes that changed."""
+        new = bytes(state & 0xFF if state else 0 for state in states)
+        if len(new) < len(self.states):
+            new += bytes(self.states[len(new) :])
+        old = self.states
+        if new[: len(old)] == old:
+            changed = []
+        else:
+            changed = [i for i, (a, b) in enumerate(zip(old, new)) if a != b]
+        self.states = bytearray(new)
+        return changed
+
+    def update_range(self, offset, states):
+        """Load one GetByWay page starting at offset, return changed indexes."""
+        end = offset + len(states)
+        if end > len(self.states):
+            self.states.extend(bytes(end - len(self.states)))
+        new = bytes(state & 0xFF if state else 0 for state in states)
+        old = self.states[offset:end]
+        if new == old:
+            return []
+        self.states[offset:end] = new
+        return [offset + i for i, (a, b) in enumerate(zip(old, new)) if a != b]
+
+    def state(self, index):
+        return self.states[index]
+
+    def flags(self, index):
+        return FLAGS[self.states[index]]
+
+    def is_open(self, index):
+        return OPEN[self.states[index]] == 1
+
+    def is_low_battery(self, index):
+        return LOW_BATTERY[self.states[index]] == 1
+
+    def is_alert(self, index):
+        return ALERT[self.states[index]] == 1
+
+    def bypass_candidates(self):
+        """Return the indexes of open, not yet bypassed, bypassable zones."""
+        return sorted(
+            zone.index
+            for zone in self._zones.values()
+            if zone.type in BYPASSABLE_TYPES
+            and zone.index < len(self.states)
+            and OPEN[self.states[zone.index]]
+            and not FLAGS[self.states[zone.index]] & ZONE_BYPASS
+        )
+
+    def set_bypass(self, index):
+        """Mark a zone bypassed until the next GetByWay."""
+        self.states[index] |= ZONE_BYPASS
+
+    def __getitem__(self, id):
+        return self._zones[id]
+
+    def __delitem__(self, id):
+        del self._zones[id]
+
+    def __contains__(self, id):
+        return id in self._zones
+
+    def __iter__(self):
+        return iter(self._zones)
+
+    def __len__(self):
+        return len(self._zones)
+
+    def get(self, id, default=None):
+        return self._zones.get(id, default)
+
+    def keys(self):
+        return self._zones.keys()
+
+    def values(self):
+        return self._zones.values()
+
+    def items(self):
+        return self._zones.items()
+
+    def clear(self):
+        self._zones.clear()
+        self.states = bytearray()
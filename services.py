@@ -0,0 +1,202 @@
+"""iAlarm-MK integration services."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.helpers import config_validation as cv
+
+from . import libpyialarmmk as ipyialarmmk
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    SERVICE_APPLY_CONFIG,
+    SERVICE_EXPORT_CONFIG,
+    SERVICE_QUERY_JOURNAL,
+    SERVICE_ZONE_STATISTICS,
+    SNAPSHOT_DIR,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_ENTRY_ID = "entry_id"
+ATTR_FILE = "file"
+ATTR_DRY_RUN = "dry_run"
+ATTR_PAIRING = "pairing"
+ATTR_PHONES = "phones"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_LIMIT = "limit"
+
+EXPORT_CONFIG_SCHEMA = vol.Schema(
+    {vol.Optional(ATTR_ENTRY_ID): vol.All(cv.ensure_list, [cv.string])}
+)
+# Panels are never configured implicitly, the target is always named.
+APPLY_CONFIG_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTRY_ID): vol.All(
+            cv.ensure_list, [cv.string], vol.Length(min=1)
+        ),
+        vol.Required(ATTR_FILE): cv.string,
+        vol.Optional(ATTR_DRY_RUN, default=False): cv.boolean,
+        vol.Optional(ATTR_PAIRING, default=False): cv.boolean,
+        vol.Optional(ATTR_PHONES, default=False): cv.boolean,
+    }
+)
+
+QUERY_JOURNAL_SCHEMA = EXPORT_CONFIG_SCHEMA.extend(
+    {
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_LIMIT, default=500): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=10000)
+        ),
+    }
+)
+
+
+def _selected(hass: HomeAssistant, call: ServiceCall) -> list:
+    coordinators = hass.data.get(DOMAIN, {})
+    entry_ids = call.data.get(ATTR_ENTRY_ID) or list(coordinators)
+    return [coordinators[i] for i in entry_ids if i in coordinators]
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration wide services once."""
+    if hass.services.has_service(DOMAIN, SERVICE_EXPORT_CONFIG):
+        return
+
+    async def async_export_config(call: ServiceCall) -> ServiceResponse:
+        """Snapshot the configuration of every panel, concurrently."""
+        directory = hass.config.path(SNAPSHOT_DIR)
+        await hass.async_add_executor_job(os.makedirs, directory, 0o700, True)
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+
+        async def export(coordinator):
+            path = os.path.join(
+                directory, f"{coordinator.mac.replace(':', '')}_{stamp}.json.gz"
+            )
+            try:
+                return await hass.async_add_executor_job(
+                    coordinator.ialarmmk.export_config, path, {"mac": coordinator.mac}
+                )
+            except Exception as ex:
+                _LOGGER.debug("iAlarm-MK Unable to export config", exc_info=True)
+                return {"error": str(ex) or type(ex).__name__}
+
+        selected = _selected(hass, call)
+        results = await asyncio.gather(*(export(c) for c in selected))
+        return {c.mac: result for c, result in zip(selected, results)}
+
+    async def async_apply_config(call: ServiceCall) -> ServiceResponse:
+        """Bring the panels to a snapshot, writing only what differs."""
+        # Snapshots are only read from the export directory.
+        path = os.path.join(
+            hass.config.path(SNAPSHOT_DIR), os.path.basename(call.data[ATTR_FILE])
+        )
+        _, config = await hass.async_add_executor_job(ipyialarmmk.read_snapshot, path)
+
+        async def apply(coordinator):
+            try:
+                return await hass.async_add_executor_job(
+                    coordinator.ialarmmk.apply_config,
+                    config,
+                    call.data[ATTR_DRY_RUN],
+                    call.data[ATTR_PAIRING],
+                    call.data[ATTR_PHONES],
+                )
+            except Exception as ex:
+                _LOGGER.debug("iAlarm-MK Unable to apply config", exc_info=True)
+                return {"error": str(ex) or type(ex).__name__}
+
+        selected = _selected(hass, call)
+        results = await asyncio.gather(*(apply(c) for c in selected))
+        return {c.mac: result for c, result in zip(selected, results)}
+
+    async def async_zone_statistics(call: ServiceCall) -> ServiceResponse:
+        """Return the activity statistics of every zone, numbered from 1."""
+        response = {}
+        for coordinator in _selected(hass, call):
+            zone_stats = coordinator.ialarmmk.zone_stats
+            zones = {}
+            for sensor in coordinator.sensors.values():
+                stats = zone_stats.get(sensor.index)
+                if stats is None:
+                    stats = {"last_opened": None, "opens": 0, "opens_last_hour": 0}
+                elif stats["last_opened"] is not None:
+                    stats["last_opened"] = dt_util.utc_from_timestamp(
+                        stats["last_opened"]
+                    ).isoformat()
+                zones[str(sensor.index + 1)] = {"name": sensor.name, **stats}
+            response[coordinator.mac] = zones
+        return response
+
+    async def async_query_journal(call: ServiceCall) -> ServiceResponse:
+        """Return the journaled alarm frames and commands of a time range."""
+
+        def timestamp(key):
+            value = call.data.get(key)
+            return dt_util.as_utc(value).timestamp() if value is not None else None
+
+        start, end = timestamp(ATTR_START), timestamp(ATTR_END)
+        response = {}
+        for coordinator in _selected(hass, call):
+            journal = coordinator.ialarmmk.journal
+            if journal is None:
+                continue
+            response[coordinator.mac] = await hass.async_add_executor_job(
+                journal.query, start, end, call.data[ATTR_LIMIT]
+            )
+        return response
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_CONFIG,
+        async_export_config,
+        schema=EXPORT_CONFIG_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_APPLY_CONFIG,
+        async_apply_config,
+        schema=APPLY_CONFIG_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_ZONE_STATISTICS,
+        async_zone_statistics,
+        schema=EXPORT_CONFIG_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUERY_JOURNAL,
+        async_query_journal,
+        schema=QUERY_JOURNAL_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+
+@callback
+def async_unload_services(hass: HomeAssistant) -> None:
+    """Remove the integration wide services with the last entry."""
+    hass.services.async_remove(DOMAIN, SERVICE_EXPORT_CONFIG)
+    hass.services.async_remove(DOMAIN, SERVICE_APPLY_CONFIG)
+    hass.services.async_remove(DOMAIN, SERVICE_ZONE_STATISTICS)
+    hass.services.async_remove(DOMAIN, SERVICE_QUERY_JOURNAL)
@@ -0,0 +1,79 @@
+"""Interfaces with iAlarmMk panel outputs."""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from homeassistant.components.switch import SwitchEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import device_registry
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from . import iAlarmMkDataUpdateCoordinator
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Set up the iAlarm-MK outputs paired with the panel."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    async_add_entities(
+        iAlarmMkSwitch(coordinator, switch)
+        for switch in coordinator.ialarmmk.switches.values()
+    )
+
+
+class iAlarmMkSwitch(CoordinatorEntity[iAlarmMkDataUpdateCoordinator], SwitchEntity):
+    """A panel output, refreshed with the zone poll and driven with OpSwitch."""
+
+    _attr_icon = "mdi:electric-switch"
+
+    def __init__(self, coordinator: iAlarmMkDataUpdateCoordinator, switch) -> None:
+        super().__init__(coordinator)
+        self._switch = switch
+        self._attr_name = switch.name
+        self._attr_unique_id = f"{coordinator.mac}_switch_{switch.index}"
+        self._attr_device_info = DeviceInfo(
+            manufacturer="iAlarm-MK",
+            connections={(device_registry.CONNECTION_NETWORK_MAC, coordinator.mac)},
+        )
+        self._attr_is_on = coordinator.data[0].switch(switch.index)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # The snapshot delivered with this update, not the live one.
+        self._attr_is_on = self.coordinator.data[0].switch(self._switch.index)
+        super()._handle_coordinator_update()
+
+    @property
+    def assumed_state(self) -> bool:
+        # Panels not reporting the output state only know the last command.
+        return not self._switch.reported
+
+    @property
+    def available(self) -> bool:
+        # Delivered with the update, not recomputed on every state write.
+        return super().available and self.coordinator.data[1]
+
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        await self._async_set(True)
+
+    async def async_turn_off(self, **kwargs: Any) -> None:
+        await self._async_set(False)
+
+    async def _async_set(self, on: bool) -> None:
+        try:
+            await self.hass.async_add_executor_job(
+                self.coordinator.ialarmmk.set_switch, self._switch.index, on
+            )
+        except Exception as ex:
+            raise HomeAssistantError("iAlarm-MK unable to operate switch") from ex
+        self.coordinator.async_publish()
@@ -0,0 +1,6 @@
+"""Make libpyialarmmk importable on its own, without Home Assistant."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
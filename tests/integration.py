@@ -0,0 +1,110 @@
+"""Set the integration up in a bare Home Assistant, over a stub panel.
+
+The interface is stubbed where it would reach the relay: the MAC, status,
+zones and outputs come from here, the push channel never connects and
+polls change nothing. Everything else, from the coordinator to the
+entities, is the real code.
+"""
+
+import asyncio
+import importlib
+import os
+import shutil
+import sys
+import time
+import warnings
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOMAIN = "ialarm-mk"
+PACKAGE = f"custom_components.{DOMAIN}"
+MAC = "00:11:22:33:44:55"
+
+
+def require_home_assistant():
+    """Skip unless a Home Assistant able to load the integration is installed."""
+    config_entries = pytest.importorskip("homeassistant.config_entries")
+    if not hasattr(config_entries, "OptionsFlowWithReload"):
+        pytest.skip("Home Assistant too old for the integration")
+
+
+def link(config_dir):
+    """Make config_dir/custom_components/ialarm-mk the repo, importable."""
+    custom = os.path.join(config_dir, "custom_components")
+    os.makedirs(custom, exist_ok=True)
+    if not os.path.exists(os.path.join(custom, DOMAIN)):
+        os.symlink(ROOT, os.path.join(custom, DOMAIN))
+    if config_dir not in sys.path:
+        sys.path.insert(0, config_dir)
+
+
+def stub_interface(monkeypatch, zones=128):
+    """Replace the relay I/O of iAlarmMkInterface with a static panel."""
+    with warnings.catch_warnings():
+        # The codec regexes predate raw strings.
+        warnings.simplefilter("ignore", SyntaxWarning)
+        module = importlib.import_module(f"{PACKAGE}.libpyialarmmk.ipyialarmmk")
+    interface = module.iAlarmMkInterface
+
+    def _get_status(self):
+        self.status = self.ARMED_AWAY
+        self._mark_success()
+
+    def _init_sensors(self):
+        for index in range(zones):
+            zone = {"Name": f"Zone {index + 1}", "Type": 1 + index % 4}
+            self.sensors.add(f"S{index:03d}", index, zone, interface.ZONE_IN_USE)
+            self.sensor_number += 1
+
+    async def subscribe(self):
+        await asyncio.Event().wait()
+
+    async def polling_once(self):
+        self._mark_success()
+        return False
+
+    monkeypatch.setattr(interface, "get_mac", lambda self: MAC)
+    monkeypatch.setattr(interface, "_get_status", _get_status)
+    monkeypatch.setattr(interface, "_init_sensors", _init_sensors)
+    monkeypatch.setattr(interface, "discover_switches", lambda self: self.publish())
+    monkeypatch.setattr(interface, "subscribe", subscribe)
+    monkeypatch.setattr(interface, "polling_once", polling_once)
+    return interface
+
+
+async def async_start(config_dir):
+    """Return a Home Assistant with its registries loaded, nothing set up."""
+    from homeassistant import config_entries, loader
+    from homeassistant.bootstrap import async_load_base_functionality
+    from homeassistant.core import HomeAssistant
+
+    shutil.rmtree(os.path.join(config_dir, ".storage"), ignore_errors=True)
+    hass = HomeAssistant(config_dir)
+    hass.config.skip_pip = True
+    loader.async_setup(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await async_load_base_functionality(hass)
+    return hass
+
+
+async def async_add_entry(hass):
+    """Add and set up a panel entry, return (entry, seconds taken)."""
+    from homeassistant.config_entries import ConfigEntry
+
+    entry = ConfigEntry(
+        data={"username": "uid", "password": "pwd", "sensor_install_enabled": True},
+        discovery_keys={},
+        domain=DOMAIN,
+        minor_version=1,
+        options={"event_journal": False},
+        source="user",
+        subentries_data=None,
+        title="iAlarm-MK",
+        unique_id=MAC,
+        version=1,
+    )
+    start = time.perf_counter()
+    await hass.config_entries.async_add(entry)
+    await hass.async_block_till_done()
+    return entry, time.perf_counter() - start
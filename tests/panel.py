@@ -0,0 +1,63 @@
+"""A panel answering GetByWay over an in-memory socket."""
+
+import re
+
+from libpyialarmmk.framer import HEADER_SIZE, TRAILER_SIZE, Framer, xor
+
+_OFFSET = re.compile(rb"<Offset>S32,\d+,\d+\|(\d+)</Offset>")
+
+
+class FakePanel:
+    """
+    Socket stand-in for a panel with `zones` GetByWay slots.
+
+    Replies are sent in pages of `page_size` entries, as the relay does;
+    `states` maps a zone index to its raw state byte, 0 otherwise.
+    """
+
+    def __init__(self, zones=128, page_size=16, states=None):
+        self.zones = zones
+        self.page_size = page_size
+        self.states = dict(states or {})
+        self.requests = 0
+        self._framer = Framer()
+        self._pending = bytearray()
+
+    def sendall(self, frame):
+        frame = bytes(frame)
+        payload = bytes(xor(frame[HEADER_SIZE:-TRAILER_SIZE]))
+        offset = int(_OFFSET.search(payload).group(1))
+        seq = int(frame[8:12])
+        self.requests += 1
+        self._pending += self._framer.pack(self.page(offset), seq)
+
+    def recv_into(self, view):
+        n = min(len(view), len(self._pending))
+        view[:n] = self._pending[:n]
+        del self._pending[:n]
+        return n
+
+    def page(self, offset):
+        count = max(0, min(self.page_size, self.zones - offset))
+        entries = b"".join(
+            b"<L%d>S32,0,255|%d</L%d>" % (i, self.states.get(offset + i, 0), i)
+            for i in range(count)
+        )
+        return (
+            b"<Root><Host><GetByWay><Total>S32,0,%d|%d</Total>"
+            b"<Offset>S32,0,%d|%d</Offset><Ln>S32,0,%d|%d</Ln>%s"
+            b"<Err>ERR|00</Err></GetByWay></Host></Root>"
+            % (self.zones, self.zones, self.zones, offset, self.page_size, count, entries)
+        )
+
+    def getpeername(self):
+        return ("127.0.0.1", 18034)
+
+    def fileno(self):
+        return 3
+
+    def shutdown(self, how):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,112 @@
+"""Minimal writes of configdiff."""
+
+import time
+
+from libpyialarmmk import configdiff
+
+SYS = {
+    "InDelay": 10,
+    "OutDelay": 20,
+    "AlarmTime": 3,
+    "WlLoss": 0,
+    "AcLoss": 0,
+    "ComLoss": 0,
+    "ArmVoice": True,
+    "ArmReport": False,
+    "ForceArm": False,
+    "DoorCheck": False,
+    "BreakCheck": False,
+    "AlarmLimit": False,
+}
+
+
+class FakeClient:
+    def __init__(self, config):
+        self.config = config
+        self.calls = []
+
+    def pipelined(self, *calls):
+        self.calls.extend(name for name, _ in calls)
+        results = []
+        for name, args in calls:
+            if name.startswith("Get"):
+                results.append(self.config.get(name))
+                continue
+            reader = "G" + name[1:]
+            if reader in configdiff.RECORDS:
+                fields = configdiff.WRITERS[reader][1]
+                self.config[reader] = {**self.config[reader], **dict(zip(fields, args))}
+            else:
+                self.config[reader][args[0]] = {"Code": args[1]}
+            results.append(None)
+        return results
+
+
+def test_identical_snapshot_is_a_no_op():
+    live = {
+        "GetSys": dict(SYS),
+        "GetZone": [{"Type": 1, "Voice": 0, "Name": "Door", "Bell": True}],
+    }
+    desired = {
+        "GetSys": dict(SYS),
+        "GetZone": [{"Type": 1, "Voice": 0, "Name": "Door", "Bell": True}],
+    }
+
+    assert configdiff.diff(desired, live) == []
+
+    client = FakeClient(live)
+    result = configdiff.apply(client, desired)
+    assert result["writes"] == 0
+    assert result["reads"] == 2
+    assert client.calls == ["GetSys", "GetZone"]
+
+
+def test_record_fields_missing_from_the_snapshot_keep_their_live_value():
+    live = {"GetSys": {**SYS, "Time": time.localtime(0)}}
+    desired = {"GetSys": {"InDelay": 30}}
+
+    (call,) = configdiff.diff(desired, live)
+
+    setter, args, reader = call
+    assert (setter, reader) == ("SetSys", "GetSys")
+    assert args == tuple({**SYS, "InDelay": 30}[f] for f in configdiff.SYS_FIELDS)
+
+
+def test_fields_the_setter_does_not_write_are_ignored():
+    live = {"GetSys": {**SYS, "Time": time.localtime(0)}}
+    desired = {"GetSys": {**SYS, "Time": "2024-01-01"}}
+
+    assert configdiff.diff(desired, live) == []
+
+
+def test_pairing_codes_and_phones_are_only_written_on_request():
+    live = {
+        "GetSensor": [{"Code": "0"}],
+        "GetPhone": [{"Num": ""}],
+    }
+    desired = {
+        "GetSensor": [{"Code": "123456"}],
+        "GetPhone": [{"Num": "5551234"}],
+    }
+
+    client = FakeClient(live)
+    result = configdiff.apply(client, desired, dry_run=True)
+    assert result["planned"] == []
+    assert result["skipped"] == ["GetPhone", "GetSensor"]
+    assert client.calls == []
+
+    result = configdiff.apply(client, desired, dry_run=True, pairing=True)
+    assert result["planned"] == [["SetSensor", [0, "123456"]]]
+    assert result["skipped"] == ["GetPhone"]
+
+
+def test_only_written_readers_are_verified():
+    live = {"GetSys": dict(SYS), "GetSensor": [{"Code": "0"}, {"Code": "7"}]}
+    desired = {"GetSys": dict(SYS), "GetSensor": [{"Code": "1"}, {"Code": "7"}]}
+
+    client = FakeClient(live)
+    result = configdiff.apply(client, desired, pairing=True)
+
+    assert result["writes"] == 1
+    assert result["failed"] == []
+    assert client.calls == ["GetSys", "GetSensor", "SetSensor", "GetSensor"]
@@ -0,0 +1,100 @@
+"""Dedup and coalescing of the event pipeline."""
+
+import asyncio
+
+from libpyialarmmk.events import EventPipeline
+
+
+def _cids(events):
+    return [event.cid for event in events]
+
+
+def test_repeated_cid_without_seq_or_time_is_delivered():
+    pipeline = EventPipeline()
+    delivered = []
+    pipeline.subscribe(delivered.append)
+
+    for cid in (3401, 1401, 3401):
+        pipeline.publish({"Cid": str(cid)})
+
+    assert _cids(delivered) == [3401, 1401, 3401]
+    assert pipeline.duplicates == 0
+
+
+def test_resent_frame_is_dropped():
+    pipeline = EventPipeline()
+    delivered = []
+    pipeline.subscribe(delivered.append)
+
+    pipeline.publish({"Cid": "3401", "Seq": "7"})
+    pipeline.publish({"Cid": "3401", "Seq": "7"})
+    pipeline.publish({"Cid": "1401", "Zone": "0", "Time": "12:00"})
+    pipeline.publish({"Cid": "1401", "Zone": "0", "Time": "12:00"})
+    pipeline.publish({"Cid": "1401", "Zone": "0", "Time": "12:01"})
+
+    assert _cids(delivered) == [3401, 1401, 1401]
+    assert pipeline.duplicates == 2
+
+
+def test_synthetic_events_bypass_dedup():
+    pipeline = EventPipeline()
+    delivered = []
+    pipeline.subscribe(delivered.append)
+
+    pipeline.publish({"Cid": "3401", "Seq": "7"})
+    pipeline.publish({"Cid": "3401", "Seq": "7"}, synthetic=True)
+
+    assert len(delivered) == 2
+
+
+def test_storm_is_coalesced_in_last_occurrence_order():
+    async def run():
+        pipeline = EventPipeline(storm_threshold=4)
+        delivered = []
+        pipeline.subscribe(delivered.append)
+        pipeline.start()
+        # Published before the dispatcher runs, so they form one batch.
+        for cid, zone in [(1131, 1), (1131, 2), (1131, 1), (3401, 0), (1131, 2)]:
+            pipeline.publish({"Cid": str(cid), "Zone": str(zone)})
+        for _ in range(5):
+            await asyncio.sleep(0)
+        pipeline.stop()
+        return pipeline, delivered
+
+    pipeline, delivered = asyncio.run(run())
+
+    assert [(e.cid, e.zone, e.count) for e in delivered] == [
+        (1131, 1, 2),
+        (3401, 0, 1),
+        (1131, 2, 2),
+    ]
+    assert pipeline.coalesced == 2
+
+
+def test_small_batch_is_not_coalesced():
+    async def run():
+        pipeline = EventPipeline(storm_threshold=8)
+        delivered = []
+        pipeline.subscribe(delivered.append)
+        pipeline.start()
+        for cid in (1131, 1131, 3401):
+            pipeline.publish({"Cid": str(cid), "Zone": "1"})
+        for _ in range(5):
+            await asyncio.sleep(0)
+        pipeline.stop()
+        return delivered
+
+    assert _cids(asyncio.run(run())) == [1131, 1131, 3401]
+
+
+def test_publish_after_stop_is_delivered_inline():
+    async def run():
+        pipeline = EventPipeline()
+        delivered = []
+        pipeline.subscribe(delivered.append)
+        pipeline.start()
+        pipeline.stop()
+        pipeline.publish({"Cid": "1401"})
+        return delivered
+
+    assert _cids(asyncio.run(run())) == [1401]
@@ -0,0 +1,103 @@
+"""Frame assembly, reception and per-frame allocations of the framer."""
+
+import os
+import tracemalloc
+
+import pytest
+
+from libpyialarmmk.framer import _KEY, Framer, xor
+
+SIZES = (0, 1, 127, 128, 129, 279, 1200)
+
+
+class ChunkedSocket:
+    """Returns a frame at most `chunk` bytes per recv_into call, forever."""
+
+    def __init__(self, frame, chunk=7):
+        self.frame = bytes(frame)
+        self.chunk = chunk
+        self.pos = 0
+
+    def recv_into(self, view):
+        n = min(len(view), self.chunk, len(self.frame) - self.pos)
+        view[:n] = self.frame[self.pos : self.pos + n]
+        self.pos = (self.pos + n) % len(self.frame)
+        return n
+
+
+def _naive_xor(data):
+    # The per-byte XOR the framer replaced, kept as the reference.
+    buf = bytearray(data)
+    for i in range(len(buf)):
+        buf[i] ^= _KEY[i & 0x7F]
+    return buf
+
+
+def _naive_pack(payload, seq):
+    return b"@ieM%04d%04d0000%s%04d" % (len(payload), seq, _naive_xor(payload), seq)
+
+
+def _payload(size):
+    return (b"<Root><Host><GetByWay>" + b"x" * size)[:size]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_pack_matches_the_naive_frame(size):
+    payload = os.urandom(size)
+    assert bytes(Framer().pack(payload, 42)) == _naive_pack(payload, 42)
+    assert bytes(xor(payload)) == bytes(_naive_xor(payload))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_recv_and_decode_short_reads(size):
+    payload = _payload(size)
+    framer = Framer()
+    sock = ChunkedSocket(_naive_pack(payload, 3))
+    for _ in range(2):
+        frame = framer.recv(sock)
+        assert len(frame) == size + 20
+        assert framer.decode(frame) == payload.decode()
+
+
+def _per_frame(fn, frames=200):
+    """Peak bytes allocated by one call and bytes retained per call."""
+    fn()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        peak = 0
+        for _ in range(frames):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+        retained = (tracemalloc.get_traced_memory()[0] - before) / frames
+    finally:
+        tracemalloc.stop()
+    return peak, retained
+
+
+@pytest.mark.parametrize("size", (279, 1200))
+def test_allocations_per_frame(size):
+    payload = _payload(size)
+    framer = Framer()
+    frame = _naive_pack(payload, 1)
+    sock = ChunkedSocket(frame, len(frame))
+
+    def naive_recv():
+        data = bytes(memoryview(frame))  # what sock.recv() returned
+        return _naive_xor(data[16:-4]).decode()
+
+    results = {
+        "pack": _per_frame(lambda: framer.pack(payload, 1)),
+        "naive pack": _per_frame(lambda: _naive_pack(payload, 1)),
+        "recv": _per_frame(lambda: framer.decode(framer.recv(sock))),
+        "naive recv": _per_frame(naive_recv),
+    }
+    for name, (peak, retained) in results.items():
+        print(f"{size} B {name}: peak {peak} B, retained {retained:.2f} B per frame")
+
+    assert results["pack"][0] < results["naive pack"][0]
+    assert results["recv"][0] < results["naive recv"][0]
+    for _, retained in results.values():
+        assert retained < 1
@@ -0,0 +1,113 @@
+"""Import cost added to Home Assistant bootstrap, in fresh interpreters."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from integration import DOMAIN, link, require_home_assistant
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+
+# Microseconds, cumulative and best of RUNS with compiled bytecode. The
+# lazy package measures about 0.15 ms, the integration with its config
+# flow and utils about 4 ms on Home Assistant 2026.2.
+LIBRARY_BUDGET_US = 2000
+INTEGRATION_BUDGET_US = 8000
+
+# Stdlib modules Home Assistant already loads are imported first, so only
+# the package itself is measured.
+LIBRARY = """
+import asyncio, json, logging, sys
+import libpyialarmmk
+print(json.dumps(sorted(
+    m for m in sys.modules if m.split(".")[0] in ("libpyialarmmk", "lxml", "xmltodict")
+)))
+"""
+
+# Likewise the core and helper modules loaded before any integration.
+INTEGRATION = """
+import json, sys, warnings
+import async_timeout, voluptuous
+import homeassistant.config_entries, homeassistant.core, homeassistant.const
+import homeassistant.data_entry_flow, homeassistant.exceptions
+import homeassistant.helpers.config_validation, homeassistant.helpers.device_registry
+import homeassistant.helpers.entity_platform, homeassistant.helpers.entity_registry
+import homeassistant.helpers.event, homeassistant.helpers.storage
+import homeassistant.helpers.update_coordinator
+warnings.simplefilter("ignore", SyntaxWarning)
+for name in ("", ".config_flow", ".utils"):
+    # __import__, unlike importlib, goes through the timed import path.
+    __import__("custom_components.%(domain)s" + name)
+print(json.dumps(sorted(
+    m for m in sys.modules
+    if m.split(".")[0] in ("lxml", "xmltodict") or m.endswith(".pyialarmmk")
+)))
+""" % {"domain": DOMAIN}
+
+
+def _import(script, cwd, cache):
+    """Return the best cumulative time of each module and the modules loaded."""
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=cache)
+    # Home Assistant hosts import from compiled bytecode.
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    best, modules = {}, None
+    for _ in range(RUNS + 1):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", script],
+            cwd=cwd,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        if modules is None:
+            # The first run only compiles.
+            modules = json.loads(result.stdout)
+            continue
+        for line in result.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                name = parts[2].strip()
+                best[name] = min(best.get(name, sys.maxsize), int(parts[1]))
+    return best, modules
+
+
+@pytest.fixture(scope="module")
+def library(tmp_path_factory):
+    return _import(LIBRARY, ROOT, str(tmp_path_factory.mktemp("pycache")))
+
+
+@pytest.fixture(scope="module")
+def integration(tmp_path_factory):
+    require_home_assistant()
+    config_dir = str(tmp_path_factory.getbasetemp() / "hass")
+    link(config_dir)
+    return _import(INTEGRATION, config_dir, str(tmp_path_factory.mktemp("pycache")))
+
+
+def test_library_import_within_budget(library):
+    cumulative, _ = library
+    print(f"libpyialarmmk: {cumulative['libpyialarmmk']} us")
+    assert cumulative["libpyialarmmk"] < LIBRARY_BUDGET_US
+
+
+def test_library_import_loads_no_client_or_codec(library):
+    _, modules = library
+    assert modules == ["libpyialarmmk"]
+
+
+def test_integration_import_within_budget(integration):
+    cumulative, _ = integration
+    package = f"custom_components.{DOMAIN}"
+    times = {name: cumulative[package + name] for name in ("", ".config_flow", ".utils")}
+    print(", ".join(f"{package}{name}: {us} us" for name, us in times.items()))
+    # utils is part of the package import already.
+    assert times[""] + times[".config_flow"] < INTEGRATION_BUDGET_US
+
+
+def test_integration_import_loads_no_client_or_codec(integration):
+    _, modules = integration
+    assert modules == []
@@ -0,0 +1,88 @@
+"""Incremental panel log reads of LogSync."""
+
+from libpyialarmmk.logsync import LogSync
+
+
+class FakeLog:
+    """GetLogPage over a list, oldest entry first, like the panel."""
+
+    def __init__(self, entries, page_size=4, capacity=None):
+        self.entries = list(entries)
+        self.page_size = page_size
+        self.capacity = capacity
+        self.reads = []
+
+    def add(self, *entries):
+        self.entries.extend(entries)
+        if self.capacity is not None:
+            # A full log drops its oldest entries.
+            del self.entries[: max(len(self.entries) - self.capacity, 0)]
+
+    def GetLogPage(self, offset=0):
+        self.reads.append(offset)
+        return len(self.entries), self.entries[offset : offset + self.page_size]
+
+
+def entry(n):
+    return {"Cid": 1131, "Zone": n % 8, "Time": "t%d" % n}
+
+
+def test_first_sync_anchors_at_newest_entry():
+    log = FakeLog([entry(n) for n in range(10)])
+    sync = LogSync(page_size=4)
+
+    assert sync.sync(log) == []
+    assert sync.cursor["offset"] == 10
+    assert sync.sync(log) == []
+
+
+def test_new_entries_are_returned_oldest_first():
+    log = FakeLog([entry(n) for n in range(10)])
+    sync = LogSync(page_size=4)
+    sync.sync(log)
+
+    log.add(*[entry(n) for n in range(10, 16)])
+    assert sync.sync(log) == [entry(n) for n in range(10, 16)]
+    assert sync.cursor["offset"] == 16
+
+    log.reads.clear()
+    assert sync.sync(log) == []
+    # Only the page holding the anchor is read when nothing is new.
+    assert log.reads == [15]
+
+
+def test_cursor_survives_a_restart():
+    log = FakeLog([entry(n) for n in range(10)])
+    first = LogSync(page_size=4)
+    first.sync(log)
+    log.add(entry(10), entry(11))
+
+    restarted = LogSync(cursor=first.cursor, page_size=4)
+    assert restarted.sync(log) == [entry(10), entry(11)]
+
+
+def test_wrapped_log_resyncs_on_the_anchor():
+    log = FakeLog([entry(n) for n in range(12)], capacity=12)
+    sync = LogSync(page_size=4)
+    sync.sync(log)
+
+    # Three new entries push the three oldest out: offsets shift by three.
+    log.add(entry(12), entry(13), entry(14))
+    assert sync.sync(log) == [entry(12), entry(13), entry(14)]
+    assert sync.cursor["offset"] == 12
+
+    log.add(entry(15))
+    assert sync.sync(log) == [entry(15)]
+
+
+def test_lost_anchor_returns_the_newest_pages_only():
+    log = FakeLog([entry(n) for n in range(8)])
+    sync = LogSync(page_size=4, max_pages=2)
+    sync.sync(log)
+
+    # Log cleared and refilled: the anchor is gone.
+    log.entries = [entry(n) for n in range(100, 120)]
+    new = sync.sync(log)
+    assert new == [entry(n) for n in range(112, 120)]
+    assert len(log.reads) <= 1 + 2 + 2
+    assert sync.cursor["offset"] == 20
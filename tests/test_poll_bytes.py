@@ -0,0 +1,65 @@
+"""Bytes and parse time of a zone poll on a sparse 128-zone panel."""
+
+from panel import FakePanel
+
+from libpyialarmmk.pyialarmmk import iAlarmMkClient
+from libpyialarmmk.zones import covering_pages
+
+CONFIGURED = list(range(8)) + [100, 101]
+STATES = {index: 1 for index in CONFIGURED}
+PAGES = covering_pages(CONFIGURED, 16)
+RUNS = 20
+
+
+def _client(panel, cache=None):
+    client = iAlarmMkClient("127.0.0.1", 18034, "uid", "pwd")
+    client.sock = panel
+    client.cache = cache
+    return client
+
+
+def _poll(read, cache=None):
+    """Best of RUNS polls: (received bytes, frames, parse ms, replies)."""
+    best = None
+    for _ in range(RUNS):
+        panel = FakePanel(states=STATES)
+        client = _client(panel, cache)
+        replies = read(client)
+        sample = (client.rx_bytes, client.rx_frames, client.parse_time * 1000, replies)
+        if best is None or sample[2] < best[2]:
+            best = sample
+    return best
+
+
+def _full(client):
+    return client.GetByWay()
+
+
+def _windowed(client):
+    return client.pipelined(*[("GetByWayPage", (offset,)) for offset in PAGES])
+
+
+def test_windowed_poll_reads_only_the_configured_pages():
+    full_bytes, full_frames, full_ms, states = _poll(_full)
+    page_bytes, page_frames, page_ms, pages = _poll(_windowed)
+    cache = {}
+    _poll(_windowed, cache)
+    hit_bytes, _, hit_ms, _ = _poll(_windowed, cache)
+
+    print(
+        f"full GetByWay: {full_frames} frames, {full_bytes} B, {full_ms:.3f} ms parse\n"
+        f"pages {PAGES}: {page_frames} frames, {page_bytes} B, {page_ms:.3f} ms parse\n"
+        f"unchanged pages: {hit_bytes} B, {hit_ms:.3f} ms parse"
+    )
+
+    # Both polls see the same configured zone states.
+    windowed = {}
+    for offset, (_, entries) in zip(PAGES, pages):
+        windowed.update(enumerate(entries, offset))
+    assert len(states) == 128
+    assert [states[i] for i in CONFIGURED] == [windowed[i] for i in CONFIGURED]
+
+    assert (full_frames, page_frames) == (8, 2)
+    assert page_bytes * 3 < full_bytes
+    assert page_ms < full_ms
+    assert hit_ms == 0
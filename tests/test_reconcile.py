@@ -0,0 +1,76 @@
+"""Catching up after a push gap."""
+
+import asyncio
+import logging
+import time
+
+from libpyialarmmk.ipyialarmmk import iAlarmMkInterface
+
+
+def _interface(status, entries=()):
+    interface = iAlarmMkInterface(
+        "uid", "pwd", None, None, logger=logging.getLogger(__name__)
+    )
+    interface._read_snapshot = lambda: (status, None, list(entries))
+    statuses, delivered = [], []
+    interface.set_callback(statuses.append)
+    interface.events.subscribe(delivered.append)
+    return interface, statuses, delivered
+
+
+def _reconcile(interface, start=100.0, end=200.0):
+    asyncio.run(interface._reconcile(start, end))
+
+
+def test_triggered_panel_raises_an_alarm():
+    interface, statuses, delivered = _interface(iAlarmMkInterface.TRIGGERED)
+    interface.status = iAlarmMkInterface.ARMED_AWAY
+
+    _reconcile(interface)
+
+    assert interface.status == iAlarmMkInterface.TRIGGERED
+    assert interface.snapshot.status == iAlarmMkInterface.TRIGGERED
+    assert statuses == [iAlarmMkInterface.TRIGGERED]
+    assert [(event.cid, event.severity) for event in delivered] == [(1132, "alarm")]
+
+
+def test_arming_panel_is_published_without_an_event():
+    interface, statuses, delivered = _interface(iAlarmMkInterface.ALARM_ARMING)
+    interface.status = iAlarmMkInterface.DISARMED
+
+    _reconcile(interface)
+
+    assert interface.status == iAlarmMkInterface.ALARM_ARMING
+    assert statuses == [iAlarmMkInterface.ALARM_ARMING]
+    assert delivered == []
+
+
+def test_replayed_history_does_not_override_the_panel_status():
+    # Disarmed, then armed inside the gap, and the panel is arming again.
+    entries = [
+        {"Event": "3401", "Time": time.localtime(150)},
+        {"Event": "1401", "Time": time.localtime(160)},
+        {"Event": "3401", "Time": time.localtime(50)},
+    ]
+    interface, statuses, delivered = _interface(
+        iAlarmMkInterface.ALARM_ARMING, entries
+    )
+    interface.status = iAlarmMkInterface.DISARMED
+
+    _reconcile(interface)
+
+    assert [event.cid for event in delivered] == [3401, 1401]
+    assert interface.status == iAlarmMkInterface.ALARM_ARMING
+
+
+def test_unexplained_change_is_synthesized():
+    entries = [{"Event": "1401", "Time": time.localtime(150)}]
+    interface, statuses, delivered = _interface(
+        iAlarmMkInterface.ARMED_STAY, entries
+    )
+    interface.status = iAlarmMkInterface.ARMED_AWAY
+
+    _reconcile(interface)
+
+    assert [event.cid for event in delivered] == [1401, 3441]
+    assert interface.status == iAlarmMkInterface.ARMED_STAY
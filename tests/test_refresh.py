@@ -0,0 +1,75 @@
+"""State writes of a full 128-zone refresh."""
+
+import asyncio
+import statistics
+import time
+
+import pytest
+from integration import (
+    async_add_entry,
+    async_start,
+    link,
+    require_home_assistant,
+    stub_interface,
+)
+
+ZONES = 128
+REFRESHES = 200
+CLOSED = 1
+OPEN = 9
+
+
+@pytest.fixture
+def config_dir(tmp_path_factory):
+    require_home_assistant()
+    path = str(tmp_path_factory.getbasetemp() / "hass")
+    link(path)
+    return path
+
+
+def test_full_refresh(config_dir, monkeypatch):
+    stub_interface(monkeypatch, ZONES)
+
+    async def run():
+        hass = await async_start(config_dir)
+        entry, _ = await async_add_entry(hass)
+        coordinator = hass.data["ialarm-mk"][entry.entry_id]
+        ialarmmk = coordinator.ialarmmk
+
+        def states(kind):
+            return [
+                state
+                for state in hass.states.async_all("binary_sensor")
+                if state.attributes.get("device_class") == kind
+            ]
+
+        battery_reported = [state.last_reported for state in states("battery")]
+        samples = []
+        for n in range(REFRESHES):
+            # Every zone changes: opened, then closed again.
+            ialarmmk.sensors.update([OPEN if n % 2 == 0 else CLOSED] * ZONES)
+            ialarmmk.publish()
+            start = time.perf_counter()
+            coordinator.polling_callback()
+            samples.append(time.perf_counter() - start)
+            await hass.async_block_till_done()
+
+        zones = states("door")
+        result = (
+            len(zones),
+            sum(state.state == "on" for state in zones),
+            battery_reported == [state.last_reported for state in states("battery")],
+        )
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_stop(force=True)
+        return result, samples
+
+    (zones, opened, health_untouched), samples = asyncio.run(run())
+    print(
+        f"{ZONES}-zone refresh: median {statistics.median(samples) * 1000:.2f} ms,"
+        f" min {min(samples) * 1000:.2f} ms"
+    )
+
+    assert (zones, opened) == (ZONES, 0)
+    # Health sensors only change with a scan, never with a zone refresh.
+    assert health_untouched
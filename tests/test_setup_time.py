@@ -0,0 +1,60 @@
+"""Time to set up a 128-zone panel entry over a stub panel."""
+
+import asyncio
+
+import pytest
+from integration import (
+    async_add_entry,
+    async_start,
+    link,
+    require_home_assistant,
+    stub_interface,
+)
+
+ZONES = 128
+RELOADS = 5
+
+# Seconds. The first setup, which also imports the platforms, measures
+# about 80 ms and a reload about 30 ms on Home Assistant 2026.2.
+SETUP_BUDGET = 0.5
+RELOAD_BUDGET = 0.2
+
+
+@pytest.fixture
+def config_dir(tmp_path_factory):
+    require_home_assistant()
+    path = str(tmp_path_factory.getbasetemp() / "hass")
+    link(path)
+    return path
+
+
+def test_setup_entry_within_budget(config_dir, monkeypatch):
+    stub_interface(monkeypatch, ZONES)
+
+    async def run():
+        hass = await async_start(config_dir)
+        entry, setup = await async_add_entry(hass)
+        entities = len(hass.states.async_all())
+        reloads = []
+        for _ in range(RELOADS):
+            await hass.config_entries.async_unload(entry.entry_id)
+            start = hass.loop.time()
+            await hass.config_entries.async_setup(entry.entry_id)
+            await hass.async_block_till_done()
+            reloads.append(hass.loop.time() - start)
+        state = entry.state
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_stop(force=True)
+        return state, entities, setup, min(reloads)
+
+    state, entities, setup, reload = asyncio.run(run())
+    print(
+        f"async_setup_entry, {entities} entities: first {setup * 1000:.1f} ms,"
+        f" reload {reload * 1000:.1f} ms"
+    )
+
+    assert state.value == "loaded"
+    # Panel, then a zone, battery and tamper entity per zone.
+    assert entities == 1 + 3 * ZONES
+    assert setup < SETUP_BUDGET
+    assert reload < RELOAD_BUDGET
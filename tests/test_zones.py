@@ -0,0 +1,71 @@
+"""Zone state storage and auto-bypass selection."""
+
+from libpyialarmmk.zones import (
+    ZONE_BYPASS,
+    ZONE_FAULT,
+    ZONE_IN_USE,
+    ZoneStore,
+    covering_pages,
+)
+
+CLOSED = ZONE_IN_USE
+OPEN = ZONE_IN_USE | ZONE_FAULT
+
+
+def _store(types_and_states):
+    store = ZoneStore()
+    for index, (type_, state) in enumerate(types_and_states):
+        store.add(f"zone{index}", index, {"Name": f"Zone {index}", "Type": type_}, state)
+    return store
+
+
+def test_update_range_reports_only_changed_indexes():
+    store = _store([(1, CLOSED)] * 4)
+
+    assert store.update_range(2, [CLOSED, CLOSED]) == []
+    assert store.update_range(1, [OPEN, None, CLOSED]) == [1, 2]
+    assert list(store.states) == [CLOSED, OPEN, 0, CLOSED]
+
+
+def test_update_range_grows_the_vector():
+    store = _store([(1, CLOSED)] * 2)
+
+    assert store.update_range(4, [OPEN, CLOSED]) == [4, 5]
+    assert list(store.states) == [CLOSED, CLOSED, 0, 0, OPEN, CLOSED]
+
+
+def test_update_keeps_states_past_a_short_vector():
+    store = _store([(1, CLOSED)] * 3)
+    store.update_range(2, [OPEN])
+
+    assert store.update([OPEN, CLOSED]) == [0]
+    assert list(store.states) == [OPEN, CLOSED, OPEN]
+
+
+def test_bypass_candidates():
+    store = _store(
+        [
+            (1, OPEN),  # delay, open
+            (1, CLOSED),  # delay, closed
+            (5, OPEN),  # 24 hour, never bypassed automatically
+            (3, OPEN),  # interior, open
+            (None, OPEN),  # unknown type
+        ]
+    )
+    store.add("late", 9, {"Type": 2}, OPEN)
+
+    assert store.bypass_candidates() == [0, 3, 9]
+
+    store.set_bypass(3)
+    assert store.flags(3) & ZONE_BYPASS
+    assert store.bypass_candidates() == [0, 9]
+
+    # A zone configured past the vector read so far is not a candidate.
+    store.states = store.states[:5]
+    assert store.bypass_candidates() == [0]
+
+
+def test_covering_pages():
+    assert covering_pages([0, 1, 15, 16, 40], 16) == [0, 16, 32]
+    assert covering_pages([], 16) == []
+    assert covering_pages([3, 70], 0) == [0]
@@ -1,4 +1,6 @@
 """iAlarmMK utils."""
+from __future__ import annotations
+
 import logging
 
 from . import libpyialarmmk as ipyialarmmk